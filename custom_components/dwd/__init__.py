@@ -3,32 +3,106 @@
 from __future__ import annotations
 
 import logging
+import time
+
+import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers import config_validation as cv
-
-from .const import DOMAIN
-from .coordinator import DwdDataUpdateCoordinator
+from homeassistant.helpers.typing import ConfigType
+
+from .const import (
+    CONF_FAST_START,
+    CONF_FAST_START_DEFAULT,
+    CONF_MAX_CONCURRENT_FETCHES,
+    CONF_MAX_CONCURRENT_FETCHES_DEFAULT,
+    DATA_SCHEDULER,
+    DOMAIN,
+    MOSMIX_ELEMENTS,
+)
+from .coordinator import DwdDataUpdateCoordinator, async_remove_stored_data
+from .scheduler import DwdFetchScheduler
 
 _LOGGER = logging.getLogger(__name__)
 
-CONFIG_SCHEMA = cv.empty_config_schema(DOMAIN)
+CONFIG_SCHEMA = vol.Schema(
+    {
+        # A bare "dwd:" in configuration.yaml has no value.
+        DOMAIN: vol.Any(
+            None,
+            vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_MAX_CONCURRENT_FETCHES,
+                        default=CONF_MAX_CONCURRENT_FETCHES_DEFAULT,
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                }
+            ),
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
 PLATFORMS = [Platform.WEATHER]
 
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the scheduler shared by all config entries."""
+
+    conf = config.get(DOMAIN) or {}
+    hass.data.setdefault(DOMAIN, {})[DATA_SCHEDULER] = DwdFetchScheduler(
+        hass,
+        conf.get(CONF_MAX_CONCURRENT_FETCHES, CONF_MAX_CONCURRENT_FETCHES_DEFAULT),
+    )
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up DWD as config entry."""
 
+    start = time.perf_counter()
+
     config_entry.async_on_unload(config_entry.add_update_listener(update_listener))
 
-    coordinator = DwdDataUpdateCoordinator(hass, config_entry)
-    await coordinator.async_config_entry_first_refresh()
+    scheduler: DwdFetchScheduler = hass.data[DOMAIN][DATA_SCHEDULER]
+    coordinator = DwdDataUpdateCoordinator(
+        hass,
+        config_entry,
+        frozenset().union(*(MOSMIX_ELEMENTS[platform] for platform in PLATFORMS)),
+        scheduler,
+    )
+    restored = await coordinator.async_restore()
+
+    fast_start = config_entry.options.get(CONF_FAST_START, CONF_FAST_START_DEFAULT)
+    if fast_start:
+        # Don't let a slow or unreachable DWD server delay the setup. The entities start with the
+        # restored data, or unavailable if there is none, and get updated as soon as the first
+        # refresh in the background is done.
+        if restored:
+            coordinator.async_set_restored_data()
+        config_entry.async_create_background_task(
+            hass,
+            coordinator.async_first_refresh(in_background=True),
+            f"{DOMAIN} first refresh {config_entry.title}",
+        )
+    else:
+        await coordinator.async_first_refresh()
+
+    # All further refreshes are triggered by the scheduler as soon as the first one is done.
+    config_entry.async_on_unload(scheduler.async_add(coordinator))
 
     config_entry.runtime_data = coordinator
 
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+
+    coordinator.setup_duration = time.perf_counter() - start
+    _LOGGER.debug(
+        "Setup of %s took %.3f s (fast start: %s, restored data: %s)",
+        config_entry.title,
+        coordinator.setup_duration,
+        fast_start,
+        restored,
+    )
     return True
 
 
@@ -41,3 +115,8 @@ async def update_listener(hass: HomeAssistant, config_entry: ConfigEntry) -> Non
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     return await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
+
+
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Remove the stored data when a config entry is removed."""
+    await async_remove_stored_data(hass, config_entry)
@@ -2,45 +2,60 @@
 
 from __future__ import annotations
 
-from itertools import chain, islice
-import json
-import os
+import asyncio
+from itertools import chain
+import logging
+import time
 from typing import Any
 
-from aiohttp import ClientSession
+from aiohttp import ClientError, ClientSession
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_NAME, UnitOfLength
-from homeassistant.core import callback
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.selector import selector
 from homeassistant.util.unit_conversion import DistanceConverter
 
 from .const import (
+    AVAILABLE_DATA_CACHE_TTL,
     CONF_CURRENT_WEATHER,
     CONF_CURRENT_WEATHER_DEFAULT,
     CONF_CURRENT_WEATHER_FORECAST,
     CONF_CURRENT_WEATHER_HYBRID,
     CONF_CURRENT_WEATHER_MEASUREMENT,
+    CONF_FAST_START,
+    CONF_FAST_START_DEFAULT,
     CONF_FORECAST,
     CONF_FORECAST_DEFAULT,
+    CONF_SEARCH_QUERY,
     CONF_STATION_ID,
+    DATA_AVAILABLE_DATA,
+    DATA_AVAILABLE_DATA_PROBES,
     DOMAIN,
     DWD_FORECAST,
     DWD_MEASUREMENT,
+    PROBE_TIMEOUT,
     SOURCE_STATIONSLEXIKON,
     URL_DWD_TERMS,
     URL_STATIONS_MD,
     URL_FORECAST,
     URL_MEASUREMENT,
 )
+from .stations import DwdStation, DwdStationCatalog, async_get_station_catalog
+
+_LOGGER = logging.getLogger(__name__)
 
 # Translation workaround until there is someting better offered by Home Assistant
 STRING_NO_MEASUREMENT = {"en": "[no measurement data]", "de": "[keine Messdaten]"}
 STRING_NO_FORECAST = {"en": "[no forecast data]", "de": "[keine Vorhersagedaten]"}
 
+# Number of stations offered for selection by distance and as search results.
+NEAREST_STATIONS_COUNT = 100
+SEARCH_RESULTS_COUNT = 25
+
 
 class DwdFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     """Config flow for DWD component."""
@@ -54,7 +69,9 @@ class DwdFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         self._available_data = None
         self._current_weather = None
         self._forecast = None
-        self._show_all = False
+        self._fast_start = None
+        self._search_query = None
+        self._search_results = []
 
     def _get_translation(self, translations: dict[str, str]) -> str:
         return translations.get(self.hass.config.language, translations["en"])
@@ -74,33 +91,16 @@ class DwdFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
             if self._station_id == "nostation_custom":
                 return await self.async_step_manual()
 
-            elif self._station_id == "nostation_load_all":
-                self._show_all = True
-                return await self.async_step_user()
+            elif self._station_id == "nostation_search":
+                return await self.async_step_search()
 
             else:
-                await self.async_set_unique_id(self._station_id)
-                self._abort_if_unique_id_configured()
-
-                if not errors:
-                    self._available_data = await _get_available_data(
-                        self._station_id, async_get_clientsession(self.hass)
-                    )
-                    if len(self._available_data) == 0:
-                        errors[CONF_STATION_ID] = "no_data"
-
-                if not errors:
-                    self._name = await self.hass.async_add_executor_job(
-                        DwdFlowHandler._get_station_name, self._station_id
-                    )
-                    if self._name is None:
-                        errors[CONF_STATION_ID] = "no_station_name"
-
+                errors = await self._async_validate_station()
                 if not errors:
                     return await self.async_step_name()
 
-        stations = list(
-            await self.hass.async_add_executor_job(self._get_nearest_stations)
+        stations = self._get_nearest_stations(
+            await async_get_station_catalog(self.hass)
         )
 
         station_options = chain(
@@ -110,39 +110,27 @@ class DwdFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                     "value": "nostation_custom",
                 }
             ],
-            (
+            (self._get_station_option(*x) for x in stations),
+            [
                 {
-                    # Elevation is always in m in Home Assistant
-                    "label": f"{x['name']} ({'' if x['source'] == SOURCE_STATIONSLEXIKON else '~ '}{x['distance']:.0f} {self.hass.config.units.length_unit}, {x['altitude_delta']:+.0f} m) {self._get_translation(STRING_NO_MEASUREMENT) if not x['measurement'] else self._get_translation(STRING_NO_FORECAST) if not x['forecast'] else ''}",
-                    "value": x["id"],
+                    "label": "",
+                    "value": "nostation_search",
                 }
-                for x in stations
-            ),
+            ],
         )
 
-        if not self._show_all:
-            station_options = chain(
-                station_options,
-                [
-                    {
-                        "label": "",
-                        "value": "nostation_load_all",
-                    }
-                ],
-            )
-
         suggested_station = next(
             (
                 x
                 for x in stations
-                if x["measurement"] and x["forecast"] and abs(x["altitude_delta"]) < 500
+                if x[0].measurement and x[0].forecast and abs(x[2]) < 500
             ),
             None,
         )
         if (
             suggested_station is None
             or DistanceConverter.convert(
-                suggested_station["distance"],
+                suggested_station[1],
                 self.hass.config.units.length_unit,
                 UnitOfLength.KILOMETERS,
             )
@@ -154,7 +142,7 @@ class DwdFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
             {
                 vol.Required(
                     CONF_STATION_ID,
-                    description={"suggested_value": suggested_station["id"]},
+                    description={"suggested_value": suggested_station[0].id},
                 ): selector(
                     {
                         "select": {
@@ -176,6 +164,129 @@ class DwdFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
             description_placeholders={"dwd_terms": URL_DWD_TERMS},
         )
 
+    async def async_step_search(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle the step to search for a station by name or ID."""
+
+        errors = {}
+
+        if user_input is not None:
+            self._search_query = user_input[CONF_SEARCH_QUERY]
+
+            catalog = await async_get_station_catalog(self.hass)
+            self._search_results = self._with_units(
+                catalog.search(
+                    self._search_query,
+                    self.hass.config.latitude,
+                    self.hass.config.longitude,
+                    SEARCH_RESULTS_COUNT,
+                )
+            )
+            if self._search_results:
+                return await self.async_step_search_result()
+
+            errors[CONF_SEARCH_QUERY] = "no_match"
+
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_SEARCH_QUERY,
+                    description={"suggested_value": self._search_query},
+                ): str,
+            }
+        )
+
+        return self.async_show_form(
+            step_id="search", data_schema=schema, errors=errors, last_step=False
+        )
+
+    async def async_step_search_result(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle the step to select a station from the search results."""
+
+        errors = {}
+
+        self._station_id = None
+
+        if user_input is not None:
+            self._station_id = user_input[CONF_STATION_ID]
+
+            if self._station_id == "nostation_search":
+                return await self.async_step_search()
+
+            errors = await self._async_validate_station()
+            if not errors:
+                return await self.async_step_name()
+
+        station_options = chain(
+            (self._get_station_option(*x) for x in self._search_results),
+            [
+                {
+                    "label": "",
+                    "value": "nostation_search",
+                }
+            ],
+        )
+
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_STATION_ID,
+                    description={"suggested_value": self._search_results[0][0].id},
+                ): selector(
+                    {
+                        "select": {
+                            "options": list(station_options),
+                            "custom_value": False,
+                            "mode": "dropdown",
+                            "translation_key": "station",
+                        }
+                    }
+                )
+            }
+        )
+
+        return self.async_show_form(
+            step_id="search_result",
+            data_schema=schema,
+            errors=errors,
+            last_step=False,
+        )
+
+    async def _async_validate_station(self) -> dict[str, str]:
+        """Check the selected station and return the errors, if any."""
+
+        errors = {}
+
+        await self.async_set_unique_id(self._station_id)
+        self._abort_if_unique_id_configured()
+
+        self._available_data = await _async_get_available_data(
+            self.hass, self._station_id
+        )
+        if len(self._available_data) == 0:
+            errors[CONF_STATION_ID] = "no_data"
+
+        if not errors:
+            station = (await async_get_station_catalog(self.hass)).get(self._station_id)
+            if station is None:
+                errors[CONF_STATION_ID] = "no_station_name"
+            else:
+                self._name = station.name
+
+        return errors
+
+    def _get_station_option(
+        self, station: DwdStation, distance: float, altitude_delta: float
+    ) -> dict[str, str]:
+        return {
+            # Elevation is always in m in Home Assistant
+            "label": f"{station.name} ({'' if station.source == SOURCE_STATIONSLEXIKON else '~ '}{distance:.0f} {self.hass.config.units.length_unit}, {altitude_delta:+.0f} m) {self._get_translation(STRING_NO_MEASUREMENT) if not station.measurement else self._get_translation(STRING_NO_FORECAST) if not station.forecast else ''}",
+            "value": station.id,
+        }
+
     async def async_step_name(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -211,8 +322,8 @@ class DwdFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
             self._abort_if_unique_id_configured()
 
             if not errors:
-                self._available_data = await _get_available_data(
-                    self._station_id, async_get_clientsession(self.hass)
+                self._available_data = await _async_get_available_data(
+                    self.hass, self._station_id
                 )
                 if len(self._available_data) == 0:
                     errors[CONF_STATION_ID] = "no_data"
@@ -267,6 +378,7 @@ class DwdFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
 
         self._current_weather = None
         self._forecast = None
+        self._fast_start = None
 
         if user_input is not None:
             # CONF_CURRENT_WEATHER is always set from the UI.
@@ -274,6 +386,7 @@ class DwdFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
             # CONF_FORECAST is not configurable in the UI if no forecast is
             # available and has to default to False in this case.
             self._forecast = user_input.get(CONF_FORECAST, False)
+            self._fast_start = user_input.get(CONF_FAST_START, CONF_FAST_START_DEFAULT)
 
             return self.async_create_entry(
                 title=self._name,
@@ -281,16 +394,19 @@ class DwdFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                 options={
                     CONF_CURRENT_WEATHER: self._current_weather,
                     CONF_FORECAST: self._forecast,
+                    CONF_FAST_START: self._fast_start,
                 },
             )
         else:
             self._current_weather = CONF_CURRENT_WEATHER_DEFAULT
             self._forecast = CONF_FORECAST_DEFAULT
+            self._fast_start = CONF_FAST_START_DEFAULT
 
         schema = _create_schema(
             self._available_data,
             self._current_weather,
             self._forecast,
+            self._fast_start,
             self.hass.config.language,
         )
 
@@ -321,42 +437,33 @@ class DwdFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         """Create the options flow."""
         return DwdOptionsFlowHandler()
 
-    def _get_nearest_stations(self):
-        with open(
-            os.path.join(os.path.dirname(os.path.realpath(__file__)), "stations.json"),
-            encoding="utf-8",
-        ) as file:
-            stations = json.load(file)
-
-            for station in stations:
-                station["distance"] = self.hass.config.distance(
-                    station["latitude"], station["longitude"]
-                )
-                # The elevation is always in m in Home Assistant same as the station altitude!
-                station["altitude_delta"] = (
-                    station["altitude"] - self.hass.config.elevation
-                )
-
-            sorted_startions = sorted(stations, key=lambda x: x["distance"])
-
-            if self._show_all:
-                return sorted_startions
-            else:
-                return islice(sorted_startions, 100)
+    def _get_nearest_stations(
+        self, catalog: DwdStationCatalog
+    ) -> list[tuple[DwdStation, float, float]]:
+        """Return the stations with distance and altitude delta, sorted by distance."""
+        return self._with_units(
+            catalog.nearest(
+                self.hass.config.latitude,
+                self.hass.config.longitude,
+                NEAREST_STATIONS_COUNT,
+            )
+        )
 
-    @staticmethod
-    def _get_station_name(station_id: str):
-        with open(
-            os.path.join(os.path.dirname(os.path.realpath(__file__)), "stations.json"),
-            encoding="utf-8",
-        ) as file:
-            stations = json.load(file)
+    def _with_units(
+        self, stations: list[tuple[DwdStation, float]]
+    ) -> list[tuple[DwdStation, float, float]]:
+        """Convert the distances from km to the configured unit and add the altitude delta."""
 
-            for station in stations:
-                if station["id"] == station_id:
-                    return station["name"]
+        scale = 1 / DistanceConverter.get_unit_ratio(
+            UnitOfLength.KILOMETERS, self.hass.config.units.length_unit
+        )
+        # The elevation is always in m in Home Assistant same as the station altitude!
+        elevation = self.hass.config.elevation
 
-            return None
+        return [
+            (station, distance * scale, station.altitude - elevation)
+            for station, distance in stations
+        ]
 
 
 class DwdOptionsFlowHandler(config_entries.OptionsFlow):
@@ -393,11 +500,15 @@ class DwdOptionsFlowHandler(config_entries.OptionsFlow):
                     # CONF_FORECAST is not configurable in the UI if no forecast is
                     # available and has to default to False in this case.
                     CONF_FORECAST: user_input.get(CONF_FORECAST, False),
+                    CONF_FAST_START: user_input.get(
+                        CONF_FAST_START, CONF_FAST_START_DEFAULT
+                    ),
                 }
             )
 
-        available_data = await _get_available_data(
-            self.config_entry.data[CONF_STATION_ID], async_get_clientsession(self.hass)
+        # The options shall open without waiting for the DWD server.
+        available_data = await _async_get_available_data(
+            self.hass, self.config_entry.data[CONF_STATION_ID], use_prior=True
         )
 
         schema = _create_schema(
@@ -406,6 +517,7 @@ class DwdOptionsFlowHandler(config_entries.OptionsFlow):
                 CONF_CURRENT_WEATHER, CONF_CURRENT_WEATHER_DEFAULT
             ),
             self.config_entry.options.get(CONF_FORECAST, CONF_FORECAST_DEFAULT),
+            self.config_entry.options.get(CONF_FAST_START, CONF_FAST_START_DEFAULT),
             self.hass.config.language,
         )
 
@@ -423,6 +535,7 @@ def _create_schema(
     available_data: list,
     suggested_current_weather: str,
     suggested_forecast: bool,
+    suggested_fast_start: bool,
     language: str,
 ) -> vol.Schema:
     selector_dict = {
@@ -483,21 +596,94 @@ def _create_schema(
                 description={"suggested_value": suggested_forecast},
             )
         ] = bool
+    if DWD_MEASUREMENT in available_data or DWD_FORECAST in available_data:
+        schema_dict[
+            vol.Required(
+                CONF_FAST_START,
+                description={"suggested_value": suggested_fast_start},
+            )
+        ] = bool
 
     return vol.Schema(schema_dict)
 
 
-async def _get_available_data(
-    station_id: str, clientsession: ClientSession
-) -> list[str]:
-    result = []
+async def _async_get_available_data(
+    hass: HomeAssistant, station_id: str, use_prior: bool = False
+) -> list[int]:
+    """Return which data the station provides, as DWD_MEASUREMENT and DWD_FORECAST.
+
+    The result of probing the DWD server is cached per station for some time and shared by all
+    flows. With use_prior, the flags from the station catalog are returned right away if nothing
+    is cached, while the probes run in the background to fill the cache. There's only one probe
+    per station at a time, which is shared by all flows.
+    """
+
+    cache = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_AVAILABLE_DATA, {})
+    cached = cache.get(station_id)
+    if cached is not None and time.monotonic() - cached[0] < AVAILABLE_DATA_CACHE_TTL:
+        return cached[1]
+
+    prior = None
+    station = (await async_get_station_catalog(hass)).get(station_id)
+    if station is not None:
+        prior = {DWD_MEASUREMENT: station.measurement, DWD_FORECAST: station.forecast}
+
+    probes = hass.data[DOMAIN].setdefault(DATA_AVAILABLE_DATA_PROBES, {})
+    probe = probes.get(station_id)
+    if probe is None:
+        probe = hass.async_create_background_task(
+            _async_probe_available_data(hass, station_id, prior),
+            f"{DOMAIN} probe available data {station_id}",
+        )
+        probes[station_id] = probe
+        probe.add_done_callback(lambda _: probes.pop(station_id, None))
+
+    if use_prior and prior is not None:
+        return [key for key, available in prior.items() if available]
+
+    # Shielded, as other flows may be waiting for the same probe.
+    return await asyncio.shield(probe)
 
-    response = await clientsession.head(URL_MEASUREMENT.format(station_id=station_id))
-    if response.status >= 200 and response.status <= 299:
-        result.append(DWD_MEASUREMENT)
 
-    response = await clientsession.head(URL_FORECAST.format(station_id=station_id))
-    if response.status >= 200 and response.status <= 299:
-        result.append(DWD_FORECAST)
+async def _async_probe_available_data(
+    hass: HomeAssistant, station_id: str, prior: dict[int, bool] | None
+) -> list[int]:
+    clientsession = async_get_clientsession(hass)
 
-    return result
+    probes = {
+        DWD_MEASUREMENT: URL_MEASUREMENT.format(station_id=station_id),
+        DWD_FORECAST: URL_FORECAST.format(station_id=station_id),
+    }
+    results = await asyncio.gather(
+        *(_async_probe(clientsession, url) for url in probes.values())
+    )
+
+    available_data: list[int] = []
+    for key, available in zip(probes, results):
+        # Without an answer, the catalog is the best guess there is.
+        if available is None and prior is not None:
+            available = prior[key]
+        if available:
+            available_data.append(key)
+
+    # Only definite answers are cached, so that a temporary problem is not kept.
+    if None not in results:
+        hass.data.setdefault(DOMAIN, {}).setdefault(DATA_AVAILABLE_DATA, {})[
+            station_id
+        ] = (time.monotonic(), available_data)
+
+    return available_data
+
+
+async def _async_probe(clientsession: ClientSession, url: str) -> bool | None:
+    """Return whether the URL exists, or None if the server didn't answer in time."""
+
+    try:
+        async with asyncio.timeout(PROBE_TIMEOUT):
+            response = await clientsession.head(url)
+    except (TimeoutError, ClientError) as err:
+        _LOGGER.debug("Could not probe %s: %s", url, err)
+        return None
+
+    response.release()
+    return 200 <= response.status <= 299
@@ -16,13 +16,25 @@ from homeassistant.components.weather import (
     ATTR_CONDITION_SNOWY_RAINY,
     ATTR_CONDITION_SUNNY,
     ATTR_CONDITION_WINDY,
+    ATTR_CONDITION_WINDY_VARIANT,
 )
+from homeassistant.const import Platform
 
 DOMAIN = "dwd"
 
+DATA_SUN_CACHE = "sun_cache"
+DATA_STATION_CATALOG = "station_catalog"
+DATA_AVAILABLE_DATA = "available_data"
+DATA_AVAILABLE_DATA_PROBES = "available_data_probes"
+DATA_STARTUP_INDEX = "startup_index"
+DATA_SCHEDULER = "scheduler"
+
+ATTR_STALE_AGE = "stale_age"
+
 ATTRIBUTION = "Quelle: Deutscher Wetterdienst"
 
 CONF_STATION_ID = "station_id"
+CONF_SEARCH_QUERY = "query"
 CONF_CURRENT_WEATHER = "current_weather"
 CONF_CURRENT_WEATHER_MEASUREMENT = "measurement"
 CONF_CURRENT_WEATHER_FORECAST = "forecast"
@@ -30,6 +42,8 @@ CONF_CURRENT_WEATHER_HYBRID = "hybrid"
 CONF_CURRENT_WEATHER_DEFAULT = CONF_CURRENT_WEATHER_MEASUREMENT
 CONF_FORECAST = "forecast"
 CONF_FORECAST_DEFAULT = True
+CONF_FAST_START = "fast_start"
+CONF_FAST_START_DEFAULT = False
 
 URL_DWD_TERMS = "https://opendata.dwd.de/README.txt"
 URL_STATIONS_MD = "https://github.com/hg1337/homeassistant-dwd/blob/main/stations.md"
@@ -41,6 +55,64 @@ URL_FORECAST = "https://opendata.dwd.de/weather/local_forecasts/mos/MOSMIX_L/sin
 
 UPDATE_INTERVAL = timedelta(seconds=610)
 
+# Polls are scheduled around the expected publication of new data, see schedule.py. The
+# publication intervals are only defaults until the actual ones have been learned. UPDATE_INTERVAL
+# is used if nothing is known or a publication is overdue. All values in seconds.
+MEASUREMENT_PUBLICATION_INTERVAL = 3600
+FORECAST_PUBLICATION_INTERVAL = 6 * 3600
+POLL_WINDOW_BEFORE = 300
+POLL_WINDOW_AFTER = 1800
+POLL_INTERVAL_DENSE = 120
+POLL_INTERVAL_MIN = 30
+POLL_INTERVAL_MAX = 3600
+SCHEDULE_HISTORY = 8
+
+# Polls of different stations are spread by a fixed phase per station, which is a fraction of the
+# interval between polls outside of the publication window and of POLL_JITTER seconds for the
+# start of the window. After a restart, the first polls of stations with stored data are additionally
+# staggered by STARTUP_STAGGER seconds per station.
+POLL_JITTER = POLL_INTERVAL_DENSE
+STARTUP_STAGGER = 10
+
+# Failed polls are retried with exponential backoff, starting at BACKOFF_MIN seconds and
+# doubling up to BACKOFF_MAX, each with a random jitter of up to half of it. After
+# CIRCUIT_BREAKER_THRESHOLD consecutive failures of a product, no matter for which station, the
+# product is not requested at all for CIRCUIT_BREAKER_TIMEOUT seconds.
+BACKOFF_MIN = 60
+BACKOFF_MAX = POLL_INTERVAL_MAX
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_TIMEOUT = 900
+
+# Number of recent fetches kept for diagnostics.
+FETCH_HISTORY = 100
+
+# The fetches of all config entries share a pool with a limited number of concurrent fetches,
+# which can be configured in configuration.yaml.
+CONF_MAX_CONCURRENT_FETCHES = "max_concurrent_fetches"
+CONF_MAX_CONCURRENT_FETCHES_DEFAULT = 4
+
+# Timeout in seconds for each single request to DWD.
+REQUEST_TIMEOUT = 60
+
+# Maximum size in bytes of a decompressed forecast. The KML file of a single station is well
+# below 1 MB, so anything larger is broken and rejected before it fills the memory.
+FORECAST_MAX_SIZE = 32 * 1024 * 1024
+
+# Timeout in seconds for checking which data a station provides and how long the result is kept.
+PROBE_TIMEOUT = 10
+AVAILABLE_DATA_CACHE_TTL = 600
+
+# The last fetched data is stored per station to be available right after a restart. The forecast
+# has its own store, as it's much larger than the rest and changes less often.
+STORAGE_VERSION = 1
+STORAGE_KEY = DOMAIN + ".{station_id}"
+STORAGE_FORECAST_KEY = DOMAIN + ".{station_id}.forecast"
+STORAGE_SAVE_DELAY = 10
+
+# Sunrise and sunset are cached for the dates within this many days of the last queried date, which
+# covers the whole MOSMIX_L forecast of 10 days.
+SUN_CACHE_DAYS = 14
+
 CONDITION_PARTLYCLOUDY_THRESHOLD = 25
 CONDITION_CLOUDY_THRESHOLD = 75
 
@@ -51,6 +123,15 @@ DWD_FORECAST = 1
 
 DWD_MEASUREMENT_DATETIME = "datetime"
 
+# MOSMIX elements that are used by each platform. Only these are parsed and kept from the
+# forecast, so they have to be extended when a platform needs more. For a description of all
+# elements see https://opendata.dwd.de/weather/lib/MetElementDefinition.xml
+MOSMIX_ELEMENTS = {
+    Platform.WEATHER: frozenset(
+        ("TTT", "ww", "Td", "Neff", "RR1c", "wwP", "PPPP", "DD", "FF", "FX1")
+    ),
+}
+
 # Mapping see https://www.dwd.de/DE/leistungen/opendata/help/schluessel_datenformate/csv/poi_present_weather_zuordnung_pdf.pdf (German)
 CONDITIONS_MAP = {
     1: ATTR_CONDITION_SUNNY,
@@ -86,6 +167,103 @@ CONDITIONS_MAP = {
     31: ATTR_CONDITION_WINDY,
 }
 
+# Marker in WW_CONDITIONS for values that are sunny during the day and clear-night otherwise.
+CONDITION_SUNNY_OR_CLEAR_NIGHT = "sunny_or_clear_night"
+
+# Mapping of the MOSMIX "ww" element to conditions as (first value, last value, condition).
+# There are actually two sources for the mapping of the "ww" field. The primary description seems to be
+# https://www.dwd.de/DE/leistungen/opendata/help/schluessel_datenformate/kml/mosmix_element_weather_xls.xlsx
+# However, at first I found
+# https://www.dwd.de/DE/leistungen/pbfb_verlag_vub/pdf_einzelbaende/vub_2_binaer_barrierefrei.pdf
+# ("Aktuelles Wetter" on page 229) and started the implementation based on that. The first link basically
+# seems to be a subset of the second link. I still have some doubts regarding the values 0-3. There seems
+# to be a slight difference between the two documentations, and the value does no behave exactly as descibed.
+# For exmaple, the documentation says that 3 is for effective cloud coverage of at least 7/8 and 2 for
+# effective cloud coverage 4.6/8 to 6/8, but I could observe 3 even for 78% which is much below 6/8.
+# Still using it for now, the behavior at least seems to be the same as in the WarnWetter app so far.
+WW_CONDITION_RANGES = (
+    (0, 0, CONDITION_SUNNY_OR_CLEAR_NIGHT),
+    (1, 2, ATTR_CONDITION_PARTLYCLOUDY),
+    (3, 3, ATTR_CONDITION_CLOUDY),
+    (4, 12, ATTR_CONDITION_FOG),
+    (13, 13, ATTR_CONDITION_LIGHTNING),
+    (14, 16, ATTR_CONDITION_RAINY),
+    (17, 17, ATTR_CONDITION_LIGHTNING),
+    (18, 18, ATTR_CONDITION_WINDY),
+    (19, 19, ATTR_CONDITION_WINDY_VARIANT),
+    (20, 21, ATTR_CONDITION_RAINY),
+    (22, 22, ATTR_CONDITION_SNOWY),
+    (23, 23, ATTR_CONDITION_SNOWY_RAINY),
+    (24, 25, ATTR_CONDITION_RAINY),
+    (26, 26, ATTR_CONDITION_SNOWY),
+    (27, 27, ATTR_CONDITION_HAIL),
+    (28, 28, ATTR_CONDITION_FOG),
+    (29, 29, ATTR_CONDITION_LIGHTNING_RAINY),
+    (30, 39, ATTR_CONDITION_WINDY),
+    (40, 49, ATTR_CONDITION_FOG),
+    (50, 63, ATTR_CONDITION_RAINY),
+    (64, 65, ATTR_CONDITION_POURING),
+    (66, 67, ATTR_CONDITION_RAINY),
+    (68, 69, ATTR_CONDITION_SNOWY_RAINY),
+    (70, 79, ATTR_CONDITION_SNOWY),
+    (80, 81, ATTR_CONDITION_RAINY),
+    (82, 82, ATTR_CONDITION_POURING),
+    (83, 84, ATTR_CONDITION_SNOWY_RAINY),
+    (85, 88, ATTR_CONDITION_SNOWY),
+    (89, 90, ATTR_CONDITION_HAIL),
+    (91, 99, ATTR_CONDITION_LIGHTNING_RAINY),
+    (100, 100, CONDITION_SUNNY_OR_CLEAR_NIGHT),
+    (101, 102, ATTR_CONDITION_PARTLYCLOUDY),
+    (103, 103, ATTR_CONDITION_CLOUDY),
+    (104, 105, ATTR_CONDITION_FOG),
+    (110, 110, ATTR_CONDITION_FOG),
+    (111, 111, ATTR_CONDITION_SNOWY),
+    (112, 112, ATTR_CONDITION_LIGHTNING),
+    (118, 118, ATTR_CONDITION_WINDY),
+    (120, 120, ATTR_CONDITION_FOG),
+    (121, 123, ATTR_CONDITION_RAINY),
+    (124, 124, ATTR_CONDITION_SNOWY),
+    (125, 125, ATTR_CONDITION_RAINY),
+    (126, 126, ATTR_CONDITION_LIGHTNING_RAINY),
+    (127, 129, ATTR_CONDITION_WINDY),
+    (130, 135, ATTR_CONDITION_FOG),
+    (140, 141, ATTR_CONDITION_RAINY),
+    (142, 142, ATTR_CONDITION_POURING),
+    (143, 143, ATTR_CONDITION_RAINY),
+    (144, 144, ATTR_CONDITION_POURING),
+    (145, 146, ATTR_CONDITION_HAIL),
+    (147, 148, ATTR_CONDITION_RAINY),
+    (150, 158, ATTR_CONDITION_RAINY),
+    (160, 162, ATTR_CONDITION_RAINY),
+    (163, 163, ATTR_CONDITION_POURING),
+    (164, 165, ATTR_CONDITION_RAINY),
+    (166, 166, ATTR_CONDITION_POURING),
+    (167, 168, ATTR_CONDITION_SNOWY_RAINY),
+    (170, 178, ATTR_CONDITION_SNOWY),
+    (180, 182, ATTR_CONDITION_RAINY),
+    (183, 184, ATTR_CONDITION_POURING),
+    (185, 187, ATTR_CONDITION_SNOWY),
+    (189, 189, ATTR_CONDITION_HAIL),
+    (190, 191, ATTR_CONDITION_LIGHTNING),
+    (192, 193, ATTR_CONDITION_LIGHTNING_RAINY),
+    (194, 194, ATTR_CONDITION_LIGHTNING),
+    (195, 196, ATTR_CONDITION_LIGHTNING_RAINY),
+    (199, 199, ATTR_CONDITION_WINDY_VARIANT),
+)
+
+# Lookup table for the condition of each "ww" value from 0 to 199, None if there is no condition.
+WW_CONDITIONS: tuple[str | None, ...] = tuple(
+    next(
+        (
+            condition
+            for first, last, condition in WW_CONDITION_RANGES
+            if first <= value <= last
+        ),
+        None,
+    )
+    for value in range(200)
+)
+
 DWD_MEASUREMENT_PRESENT_WEATHER = "present_weather"
 DWD_MEASUREMENT_TEMPERATURE = "dry_bulb_temperature_at_2_meter_above_ground"
 DWD_MEASUREMENT_PRESSURE = "pressure_reduced_to_mean_sea_level"
@@ -101,8 +279,6 @@ DWD_MEASUREMENT_MEANWIND_DIRECTION = (
 DWD_MEASUREMENT_CLOUD_COVER_TOTAL = "cloud_cover_total"
 DWD_MEASUREMENT_DEW_POINT = "dew_point_temperature_at_2_meter_above_ground"
 
-DWD_FORECAST_TIMESTAMP = "timestamp"
-
 SOURCE_STATIONSLEXIKON = 0
 SOURCE_MOSMIX_STATIONSKATALOG = 1
 
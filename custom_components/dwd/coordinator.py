@@ -1,17 +1,26 @@
 """DataUpdateCoordinator for DWD integration."""
 
+import asyncio
 import codecs
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable
+import concurrent.futures
 from datetime import UTC, datetime
-from io import BytesIO
+from email.utils import parsedate_to_datetime
 import logging
-import zipfile
+from statistics import median
+import threading
+import time
+from typing import Any
+import zlib
 
-from aiohttp import ClientSession
-from defusedxml import ElementTree
+from aiohttp import ClientError, ClientResponse, ClientSession
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
 from .const import (
@@ -23,212 +32,760 @@ from .const import (
     CONF_FORECAST,
     CONF_FORECAST_DEFAULT,
     CONF_STATION_ID,
+    DATA_STARTUP_INDEX,
     DOMAIN,
     DWD_FORECAST,
-    DWD_FORECAST_TIMESTAMP,
     DWD_MEASUREMENT,
     DWD_MEASUREMENT_DATETIME,
+    FETCH_HISTORY,
+    FORECAST_MAX_SIZE,
+    FORECAST_PUBLICATION_INTERVAL,
+    MEASUREMENT_PUBLICATION_INTERVAL,
     MEASUREMENTS_MAX_AGE,
+    POLL_INTERVAL_MIN,
+    REQUEST_TIMEOUT,
+    STARTUP_STAGGER,
+    STORAGE_FORECAST_KEY,
+    STORAGE_KEY,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
     UPDATE_INTERVAL,
     URL_FORECAST,
     URL_MEASUREMENT,
 )
+from .mosmix import KmzStream, MosmixForecast, parse_kml
+from .schedule import DwdPollSchedule
+from .scheduler import DwdFetchScheduler
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class DwdStatusError(UpdateFailed):
+    """Unexpected HTTP status code from DWD."""
+
+    def __init__(self, status: int, url: str) -> None:
+        """Initialize."""
+        super().__init__(f"Unexpected status code {status} from {url}.")
+        self.status: int = status
+
+
 class DwdDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching DWD data."""
 
-    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        forecast_elements: Iterable[str],
+        scheduler: DwdFetchScheduler,
+    ) -> None:
         """Initialize global DWD data updater."""
 
         self._config_entry: ConfigEntry = config_entry
+        self._scheduler: DwdFetchScheduler = scheduler
         self._clientsession: ClientSession = async_get_clientsession(hass)
 
         self._last_measurement: dict | None = None
-        self._last_forecast: dict | None = None
+        self._last_forecast: MosmixForecast | None = None
         self._last_measurement_etag: str | None = None
         self._last_forecast_etag: str | None = None
+        self._last_measurement_last_modified: str | None = None
+        self._last_forecast_last_modified: str | None = None
+
+        # A forecast is sometimes published again with a new ETag, but the same content. The
+        # CRC-32 and size of the KML file identify the content, so it's only parsed if it changed.
+        self._last_forecast_content_id: tuple[int, int] | None = None
+        self.forecast_parse_skipped: int = 0
+
+        # The last fetched data is stored, so that it is available right after a restart and
+        # only has to be revalidated instead of downloaded and parsed again.
+        self._store: Store = _get_store(hass, config_entry, STORAGE_KEY)
+        self._forecast_store: Store = _get_store(
+            hass, config_entry, STORAGE_FORECAST_KEY
+        )
+
+        # Durations in seconds of the config entry setup and of the first refresh, which make the
+        # difference between a setup with and without fast start visible.
+        self.setup_duration: float | None = None
+        self.first_refresh_duration: float | None = None
+
+        # Only the forecast elements that are actually used are parsed and kept.
+        self._forecast_elements: set[str] = set(forecast_elements)
+
+        # Duration of the last forecast parsing in seconds, for performance analysis.
+        self.forecast_parse_duration: float | None = None
+
+        # Each product is only polled when it's due according to its schedule. The coordinator
+        # has no timer of its own, it's refreshed by the scheduler at the next poll of all
+        # products, which is None until the first refresh is done.
+        phase = _get_phase(config_entry)
+        self._schedules: dict[int, DwdPollSchedule] = {
+            DWD_MEASUREMENT: DwdPollSchedule(MEASUREMENT_PUBLICATION_INTERVAL, phase),
+            DWD_FORECAST: DwdPollSchedule(FORECAST_PUBLICATION_INTERVAL, phase),
+        }
+
+        self.next_poll: float | None = None
+
+        # Offset in seconds of the first poll after a restart, see async_restore.
+        self.startup_stagger: float = _get_startup_stagger(hass)
+
+        # Start time, duration, product and success of the recent fetches, for diagnostics.
+        self._fetch_history: deque[tuple[float, float, int, bool]] = deque(
+            maxlen=FETCH_HISTORY
+        )
 
         _LOGGER.debug(
-            "Checking for new data for %s (%s) every %s",
+            "Checking for new data for %s (%s) based on the publication schedule",
             self._config_entry.title,
             self._config_entry.data.get(CONF_STATION_ID, None),
-            UPDATE_INTERVAL,
         )
 
-        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=UPDATE_INTERVAL)
+        super().__init__(hass, _LOGGER, name=DOMAIN)
 
     async def _async_update_data(self) -> dict:
         """Fetch data from DWD."""
 
-        try:
-            conf_current_weather = self._config_entry.options.get(
-                CONF_CURRENT_WEATHER, CONF_CURRENT_WEATHER_DEFAULT
+        conf_current_weather = self._config_entry.options.get(
+            CONF_CURRENT_WEATHER, CONF_CURRENT_WEATHER_DEFAULT
+        )
+        conf_forecast = self._config_entry.options.get(
+            CONF_FORECAST, CONF_FORECAST_DEFAULT
+        )
+
+        fetchers = {}
+
+        if conf_current_weather in (
+            CONF_CURRENT_WEATHER_MEASUREMENT,
+            CONF_CURRENT_WEATHER_HYBRID,
+        ):
+            fetchers[DWD_MEASUREMENT] = self._async_fetch_measurement
+        else:
+            _LOGGER.debug(
+                "Not fetching measurement data because current_weather is %s",
+                conf_current_weather,
             )
-            conf_forecast = self._config_entry.options.get(
-                CONF_FORECAST, CONF_FORECAST_DEFAULT
+
+        if (
+            conf_current_weather
+            in (CONF_CURRENT_WEATHER_HYBRID, CONF_CURRENT_WEATHER_FORECAST)
+            or conf_forecast
+        ):
+            fetchers[DWD_FORECAST] = self._async_fetch_forecast
+        else:
+            _LOGGER.debug(
+                "Not fetching forecast data because current_weather is %s and forecast is %s",
+                conf_current_weather,
+                conf_forecast,
             )
 
-            if conf_current_weather in (
-                CONF_CURRENT_WEATHER_MEASUREMENT,
-                CONF_CURRENT_WEATHER_HYBRID,
-            ):
-                # Fetch measurement, if new data is available (using ETag header).
+        now = time.time()
+        due = {
+            product: fetcher
+            for product, fetcher in fetchers.items()
+            if self._schedules[product].next_poll <= now + POLL_INTERVAL_MIN
+        }
 
-                url = URL_MEASUREMENT.format(
-                    station_id=self._config_entry.data[CONF_STATION_ID]
-                )
-                headers = {}
-                if self._last_measurement_etag is not None:
-                    headers["If-None-Match"] = self._last_measurement_etag
-                response = await self._clientsession.get(url, headers=headers)
-
-                if response.status == 304:
-                    _LOGGER.debug("No new data from %s", url)
-
-                elif 200 <= response.status <= 299:
-                    measurement = {}
-                    measurement_etag = response.headers.get("ETag", None)
-
-                    data = response.content
-
-                    # Read column names:
-                    line = codecs.decode(await data.readline()).strip()
-                    column_names = line.split(";")
-                    # Skip 2 additional descriptive header rows
-                    await data.readline()
-                    await data.readline()
-                    # Read actual measurement values into target dictionary
-                    # Some stations set some values only every few hours, so we go a few rows
-                    # down (up to MEASUREMENTS_MAX_AGE) to collect all values.
-                    raw_line = await data.readline()
-                    age = 0
-                    while age < MEASUREMENTS_MAX_AGE and raw_line:
-                        line = codecs.decode(raw_line).strip()
-                        fields = line.split(";")
-                        measurement.setdefault(
-                            DWD_MEASUREMENT_DATETIME,
-                            datetime.strptime(
-                                f"{fields[0]} {fields[1]}", r"%d.%m.%y %H:%M"
-                            ).replace(tzinfo=UTC),
-                        )
-                        for i in range(2, min(len(column_names), len(fields))):
-                            if fields[i] and fields[i] != "---":
-                                measurement.setdefault(column_names[i], fields[i])
-                        raw_line = await data.readline()
-                        age += 1
-
-                    self._last_measurement = measurement
-                    self._last_measurement_etag = measurement_etag
-                    _LOGGER.debug(
-                        "Measurement successfully fetched from %s. ETag: %s",
-                        url,
-                        self._last_measurement_etag,
-                    )
+        try:
+            # Both are fetched concurrently and independently, so a failure of one of them
+            # doesn't discard the result of the other one.
+            results = await asyncio.gather(
+                *(
+                    self._async_fetch_and_record(product, fetcher)
+                    for product, fetcher in due.items()
+                ),
+                return_exceptions=True,
+            )
 
+            now = time.time()
+            for product, result in zip(due, results):
+                if isinstance(result, Exception):
+                    self._schedules[product].record_failure(now)
                 else:
-                    raise UpdateFailed(
-                        f"Unexpected status code {response.status} from {url}."
+                    self._schedules[product].record_poll(
+                        now,
+                        self._get_issue_time(product),
+                        self._get_last_modified(product),
                     )
+        finally:
+            self._update_next_poll(fetchers)
+
+        errors = {
+            product: result
+            for product, result in zip(due, results)
+            if isinstance(result, Exception)
+        }
+
+        # As long as there is any data, it is kept and the entities stay available while the
+        # failed products are retried. Only without any data, there is nothing to show at all.
+        if errors and self._last_measurement is None and self._last_forecast is None:
+            error = next(iter(errors.values()))
+            raise UpdateFailed(error) from error
+
+        for product, error in errors.items():
+            # Only the first failure in a row is a warning, so an outage doesn't flood the log.
+            _LOGGER.log(
+                logging.WARNING
+                if self._schedules[product].failures == 1
+                else logging.DEBUG,
+                "Error fetching data for %s, continuing with previous data: %s",
+                self._config_entry.title,
+                error,
+            )
+
+        return self._get_data()
 
+    async def _async_fetch_and_record(
+        self, product: int, fetcher: Callable[[], Awaitable[None]]
+    ) -> None:
+        circuit_breaker = self._scheduler.get_circuit_breaker(product)
+        if not circuit_breaker.allow(time.time()):
+            raise UpdateFailed("Not requested because of too many failures recently")
+
+        # Only errors of the server or the connection count for the circuit breaker. Others,
+        # like a 404 for a station whose data is not published anymore, are specific to this
+        # station and only delay its own next poll.
+        server_ok: bool | None = None
+        try:
+            async with self._scheduler.async_slot():
+                start = time.time()
+                fetched = False
+                try:
+                    await fetcher()
+                    fetched = True
+                finally:
+                    self._fetch_history.append(
+                        (start, time.time() - start, product, fetched)
+                    )
+            server_ok = True
+        except (TimeoutError, ClientError):
+            server_ok = False
+            raise
+        except DwdStatusError as err:
+            if err.status >= 500:
+                server_ok = False
+            raise
+        finally:
+            if server_ok is None:
+                circuit_breaker.record_inconclusive()
             else:
+                circuit_breaker.record(server_ok, time.time())
+
+    def _update_next_poll(self, products: Iterable[int]) -> None:
+        next_polls = [self._schedules[product].next_poll for product in products]
+        self.next_poll = min(next_polls) if next_polls else None
+        if self.next_poll is not None:
+            _LOGGER.debug(
+                "Next check for new data for %s at %s",
+                self._config_entry.title,
+                datetime.fromtimestamp(self.next_poll, UTC),
+            )
+        self._scheduler.async_schedule()
+
+    def _get_issue_time(self, product: int) -> float | None:
+        if product == DWD_MEASUREMENT:
+            if self._last_measurement is None:
+                return None
+            return self._last_measurement[DWD_MEASUREMENT_DATETIME].timestamp()
+        if self._last_forecast is None:
+            return None
+        return self._last_forecast.issue_time
+
+    def _get_last_modified(self, product: int) -> float | None:
+        last_modified = (
+            self._last_measurement_last_modified
+            if product == DWD_MEASUREMENT
+            else self._last_forecast_last_modified
+        )
+        if last_modified is None:
+            return None
+        try:
+            return parsedate_to_datetime(last_modified).timestamp()
+        except (TypeError, ValueError):
+            return None
+
+    @property
+    def stale_age(self) -> float | None:
+        """Return how old the data is in seconds, if the last poll of any product failed.
+
+        This is None as long as all products are up to date.
+        """
+        ages = [
+            time.time() - schedule.last_success
+            for schedule in self._schedules.values()
+            if schedule.failures and schedule.last_success is not None
+        ]
+        return max(ages) if ages else None
+
+    @property
+    def next_poll_times(self) -> dict[int, datetime]:
+        """Return when each product will be polled next."""
+        return {
+            product: datetime.fromtimestamp(schedule.next_poll, UTC)
+            for product, schedule in self._schedules.items()
+        }
+
+    def get_schedule_diagnostics(self) -> dict[str, Any]:
+        """Return the state of the poll schedules for diagnostics."""
+        return {
+            "startup_stagger": self.startup_stagger,
+            "measurement": self._schedules[DWD_MEASUREMENT].as_diagnostics(),
+            "forecast": self._schedules[DWD_FORECAST].as_diagnostics(),
+        }
+
+    def get_fetch_diagnostics(self) -> dict[str, Any]:
+        """Return how the recent fetches are distributed over the hour and how long they took."""
+
+        # Fetches of different stations bunching up in the same minutes show up here.
+        minute_of_hour = [0] * 60
+        for start, _, _, _ in self._fetch_history:
+            minute_of_hour[int(start // 60 % 60)] += 1
+
+        durations = sorted(x[1] for x in self._fetch_history)
+
+        return {
+            "count": len(self._fetch_history),
+            "failed": sum(1 for x in self._fetch_history if not x[3]),
+            "minute_of_hour": minute_of_hour,
+            "duration": {
+                "min": durations[0],
+                "median": median(durations),
+                "p90": durations[int(0.9 * (len(durations) - 1))],
+                "max": durations[-1],
+            }
+            if durations
+            else None,
+        }
+
+    def _get_data(self) -> dict[str, Any]:
+        return {
+            DWD_MEASUREMENT: self._last_measurement,
+            DWD_FORECAST: self._last_forecast,
+        }
+
+    async def _async_fetch_measurement(self) -> None:
+        """Fetch measurement, if new data is available (using ETag header)."""
+
+        url = URL_MEASUREMENT.format(
+            station_id=self._config_entry.data[CONF_STATION_ID]
+        )
+        headers = _get_conditional_headers(
+            self._last_measurement_etag, self._last_measurement_last_modified
+        )
+
+        async with (
+            asyncio.timeout(REQUEST_TIMEOUT),
+            self._clientsession.get(url, headers=headers) as response,
+        ):
+            if response.status == 304:
+                _LOGGER.debug("No new data from %s", url)
+
+            elif 200 <= response.status <= 299:
+                measurement = {}
+                measurement_etag = response.headers.get("ETag", None)
+                measurement_last_modified = response.headers.get("Last-Modified", None)
+
+                data = response.content
+
+                # Read column names:
+                line = codecs.decode(await data.readline()).strip()
+                column_names = line.split(";")
+                # Skip 2 additional descriptive header rows
+                await data.readline()
+                await data.readline()
+                # Read actual measurement values into target dictionary
+                # Some stations set some values only every few hours, so we go a few rows
+                # down (up to MEASUREMENTS_MAX_AGE) to collect all values.
+                raw_line = await data.readline()
+                age = 0
+                while age < MEASUREMENTS_MAX_AGE and raw_line:
+                    line = codecs.decode(raw_line).strip()
+                    fields = line.split(";")
+                    measurement.setdefault(
+                        DWD_MEASUREMENT_DATETIME,
+                        datetime.strptime(
+                            f"{fields[0]} {fields[1]}", r"%d.%m.%y %H:%M"
+                        ).replace(tzinfo=UTC),
+                    )
+                    for i in range(2, min(len(column_names), len(fields))):
+                        if fields[i] and fields[i] != "---":
+                            measurement.setdefault(column_names[i], fields[i])
+                    raw_line = await data.readline()
+                    age += 1
+
+                self._last_measurement = measurement
+                self._last_measurement_etag = measurement_etag
+                self._last_measurement_last_modified = measurement_last_modified
+                self._store.async_delay_save(self._data_to_store, STORAGE_SAVE_DELAY)
                 _LOGGER.debug(
-                    "Not fetching measurement data because current_weather is %s",
-                    conf_current_weather,
+                    "Measurement successfully fetched from %s. ETag: %s",
+                    url,
+                    self._last_measurement_etag,
                 )
 
-            if (
-                conf_current_weather
-                in (CONF_CURRENT_WEATHER_HYBRID, CONF_CURRENT_WEATHER_FORECAST)
-                or conf_forecast
-            ):
-                # Fetch forecast, if new data is available (using ETag header).
+            else:
+                raise DwdStatusError(response.status, url)
 
-                url = URL_FORECAST.format(
-                    station_id=self._config_entry.data[CONF_STATION_ID]
-                )
-                headers = {}
-                if self._last_forecast_etag is not None:
-                    headers["If-None-Match"] = self._last_forecast_etag
-                response = await self._clientsession.get(url, headers=headers)
-
-                if response.status == 304:
-                    _LOGGER.debug("No new data from %s", url)
-
-                elif 200 <= response.status <= 299:
-                    forecast = {}
-                    forecast_etag = response.headers.get("ETag", None)
-
-                    data = await response.read()
-
-                    with zipfile.ZipFile(BytesIO(data)) as dwd_zip_file:
-                        for kml_file_name in dwd_zip_file.namelist():
-                            if kml_file_name.endswith(".kml"):
-                                with dwd_zip_file.open(kml_file_name) as kml_file:
-                                    # For a description of all elements see https://opendata.dwd.de/weather/lib/MetElementDefinition.xml
-                                    elementTree = ElementTree.parse(kml_file)
-                                    timestamps = [
-                                        datetime.strptime(
-                                            x.text, "%Y-%m-%dT%H:%M:%S.%f%z"
-                                        )
-                                        for x in elementTree.findall(
-                                            "./kml:Document/kml:ExtendedData/dwd:ProductDefinition/dwd:ForecastTimeSteps/dwd:TimeStep",
-                                            {
-                                                "kml": "http://www.opengis.net/kml/2.2",
-                                                "dwd": "https://opendata.dwd.de/weather/lib/pointforecast_dwd_extension_V1_0.xsd",
-                                            },
-                                        )
-                                    ]
-                                    forecast[DWD_FORECAST_TIMESTAMP] = timestamps
-                                    forecastElements = elementTree.findall(
-                                        "./kml:Document/kml:Placemark/kml:ExtendedData/dwd:Forecast",
-                                        {
-                                            "kml": "http://www.opengis.net/kml/2.2",
-                                            "dwd": "https://opendata.dwd.de/weather/lib/pointforecast_dwd_extension_V1_0.xsd",
-                                        },
-                                    )
-                                    for forecastElement in forecastElements:
-                                        name = forecastElement.attrib[
-                                            r"{https://opendata.dwd.de/weather/lib/pointforecast_dwd_extension_V1_0.xsd}elementName"
-                                        ]
-                                        values = forecastElement.find(
-                                            "dwd:value",
-                                            {
-                                                "kml": "http://www.opengis.net/kml/2.2",
-                                                "dwd": "https://opendata.dwd.de/weather/lib/pointforecast_dwd_extension_V1_0.xsd",
-                                            },
-                                        ).text.split()
-                                        forecast[name] = values
-
-                                # There should only be on KML file in the KMZ archive so we don't handle multiple.
-                                # Don't even know what this would mean. ;) Anyway, would complicate things a bit.
-                                break
-
-                    self._last_forecast = forecast
-                    self._last_forecast_etag = forecast_etag
-                    _LOGGER.debug(
-                        "Forecast successfully fetched from %s. ETag: %s",
-                        url,
-                        self._last_forecast_etag,
-                    )
+    async def _async_fetch_forecast(self) -> None:
+        """Fetch forecast, if new data is available (using ETag header)."""
+
+        url = URL_FORECAST.format(station_id=self._config_entry.data[CONF_STATION_ID])
+        headers = _get_conditional_headers(
+            self._last_forecast_etag, self._last_forecast_last_modified
+        )
 
+        async with asyncio.timeout(REQUEST_TIMEOUT):
+            response = await self._clientsession.get(url, headers=headers)
+
+            if response.status == 304:
+                response.release()
+                _LOGGER.debug("No new data from %s", url)
+                return
+
+            if not 200 <= response.status <= 299:
+                response.release()
+                raise DwdStatusError(response.status, url)
+
+            forecast_etag = response.headers.get("ETag", None)
+            forecast_last_modified = response.headers.get("Last-Modified", None)
+
+            # Decompressing and parsing is blocking and quite CPU intensive for the amount of
+            # data, so it's done in the executor to keep the event loop free. It runs while the
+            # forecast is still being received, the executor thread pulls the chunks from the
+            # event loop and waits for each of them. So an executor thread is held for the whole
+            # download, not only for the parsing.
+            reader = _ResponseReader(response, self.hass.loop)
+            parse = self.hass.async_add_executor_job(
+                _parse_forecast,
+                reader.read,
+                frozenset(self._forecast_elements),
+                self._last_forecast_content_id
+                if self._last_forecast is not None
+                else None,
+            )
+            try:
+                forecast, content_id, parse_duration = await asyncio.shield(parse)
+            except asyncio.CancelledError:
+                # On a timeout or unload, the parsing is stopped with the next read. The
+                # response can only be released once it's not read anymore.
+                reader.cancel()
+                await asyncio.wait([parse])
+                if not parse.cancelled():
+                    # The parsing failed because of the cancellation, that's expected.
+                    parse.exception()
+                raise
+            finally:
+                if parse.done():
+                    response.release()
                 else:
-                    raise UpdateFailed(
-                        f"Unexpected status code {response.status} from {url}."
-                    )
-            else:
-                _LOGGER.debug(
-                    "Not fetching forecast data because current_weather is %s and forecast is %s",
-                    conf_current_weather,
-                    conf_forecast,
+                    parse.add_done_callback(lambda _: response.release())
+
+        if forecast is None:
+            self.forecast_parse_skipped += 1
+            self._last_forecast_etag = forecast_etag
+            self._last_forecast_last_modified = forecast_last_modified
+            self._store.async_delay_save(self._data_to_store, STORAGE_SAVE_DELAY)
+            _LOGGER.debug("Forecast from %s is unchanged, not parsing it again", url)
+            return
+
+        self.forecast_parse_duration = parse_duration
+        _LOGGER.debug("Forecast from %s parsed in %.3f s", url, parse_duration)
+
+        self._last_forecast = forecast
+        self._last_forecast_etag = forecast_etag
+        self._last_forecast_last_modified = forecast_last_modified
+        self._last_forecast_content_id = content_id
+        self._forecast_store.async_delay_save(
+            self._forecast_to_store, STORAGE_SAVE_DELAY
+        )
+        self._store.async_delay_save(self._data_to_store, STORAGE_SAVE_DELAY)
+        _LOGGER.debug(
+            "Forecast successfully fetched from %s. ETag: %s",
+            url,
+            self._last_forecast_etag,
+        )
+
+    @callback
+    def async_add_forecast_elements(self, forecast_elements: Iterable[str]) -> None:
+        """Add forecast elements that have to be parsed from the forecast.
+
+        If elements are added that were not parsed before, the forecast is downloaded and parsed
+        again with the next update.
+        """
+
+        new_forecast_elements = set(forecast_elements) - self._forecast_elements
+        if new_forecast_elements:
+            _LOGGER.debug("Adding forecast elements %s", new_forecast_elements)
+            self._forecast_elements |= new_forecast_elements
+            self._last_forecast_etag = None
+            self._last_forecast_last_modified = None
+            self._last_forecast_content_id = None
+            self._schedules[DWD_FORECAST].next_poll = 0.0
+            if self.next_poll is not None:
+                self.next_poll = 0.0
+                self._scheduler.async_schedule()
+
+    async def async_restore(self) -> bool:
+        """Restore the last fetched data from the store.
+
+        The restored data is only revalidated with the next update, so it's neither downloaded
+        nor parsed again, if it didn't change in the meantime. Returns True, if data was restored.
+        """
+
+        try:
+            stored = await self._store.async_load()
+            stored_forecast = await self._forecast_store.async_load()
+        except HomeAssistantError as err:
+            _LOGGER.warning(
+                "Could not load stored data for %s: %s", self._config_entry.title, err
+            )
+            return False
+
+        if not stored:
+            return False
+
+        try:
+            measurement = stored["measurement"]
+            if measurement is not None:
+                measurement = dict(measurement)
+                measurement[DWD_MEASUREMENT_DATETIME] = datetime.fromisoformat(
+                    measurement[DWD_MEASUREMENT_DATETIME]
                 )
+            measurement_etag = stored["measurement_etag"]
+            measurement_last_modified = stored["measurement_last_modified"]
+
+            forecast = None
+            forecast_validators = None
+            if stored_forecast and stored_forecast["forecast"] is not None:
+                forecast = MosmixForecast.from_dict(stored_forecast["forecast"])
+
+                # If more forecast elements are needed now than when the forecast was stored, it
+                # has to be downloaded and parsed again. The same applies if the stores were not
+                # saved together and the validators don't belong to the stored forecast.
+                content_id = stored["forecast_content_id"]
+                if (
+                    self._forecast_elements <= set(stored_forecast["forecast_elements"])
+                    and content_id == stored_forecast["forecast_content_id"]
+                ):
+                    forecast_validators = (
+                        stored["forecast_etag"],
+                        stored["forecast_last_modified"],
+                        (content_id[0], content_id[1])
+                        if content_id is not None
+                        else None,
+                    )
+        except (KeyError, TypeError, ValueError, IndexError) as err:
+            _LOGGER.warning(
+                "Ignoring invalid stored data for %s: %s", self._config_entry.title, err
+            )
+            return False
+
+        self._last_measurement = measurement
+        self._last_measurement_etag = measurement_etag
+        self._last_measurement_last_modified = measurement_last_modified
+        self._last_forecast = forecast
+        if forecast_validators is not None:
+            (
+                self._last_forecast_etag,
+                self._last_forecast_last_modified,
+                self._last_forecast_content_id,
+            ) = forecast_validators
+
+        # What has been learned about the publications is kept.
+        try:
+            for key, product in (
+                ("measurement", DWD_MEASUREMENT),
+                ("forecast", DWD_FORECAST),
+            ):
+                if key in stored.get("schedules", {}):
+                    self._schedules[product].restore(stored["schedules"][key])
+        except (KeyError, TypeError, ValueError) as err:
+            _LOGGER.debug("Ignoring invalid stored schedules: %s", err)
+
+        # With fresh data available, there's no need to poll right away with the first refresh.
+        # Staggering the first polls avoids that all stations hit the DWD server at once after a
+        # restart. Data that is probably outdated already is polled right away.
+        now = time.time()
+        first_poll = now + POLL_INTERVAL_MIN + self.startup_stagger
+        for product, available in (
+            (DWD_MEASUREMENT, measurement is not None),
+            (
+                DWD_FORECAST,
+                forecast is not None and self._last_forecast_etag is not None,
+            ),
+        ):
+            schedule = self._schedules[product]
+            if available and schedule.is_fresh(now):
+                schedule.next_poll = first_poll + schedule.jitter
+
+        _LOGGER.debug("Restored stored data for %s", self._config_entry.title)
+        return True
+
+    @callback
+    def async_set_restored_data(self) -> None:
+        """Provide the restored data to the listeners until the first refresh is done."""
+        self.async_set_updated_data(self._get_data())
+
+    async def async_first_refresh(self, in_background: bool = False) -> None:
+        """Do the first refresh and record how long it took.
+
+        In the background, a failure only makes the entities unavailable instead of failing the
+        setup of the config entry.
+        """
+
+        start = time.perf_counter()
+        if in_background:
+            await self.async_refresh()
+        else:
+            await self.async_config_entry_first_refresh()
+        self.first_refresh_duration = time.perf_counter() - start
 
-            return {
-                DWD_MEASUREMENT: self._last_measurement,
-                DWD_FORECAST: self._last_forecast,
-            }
+        _LOGGER.debug(
+            "First refresh for %s took %.3f s",
+            self._config_entry.title,
+            self.first_refresh_duration,
+        )
 
-        except Exception as err:
-            raise UpdateFailed(err) from err
+    @callback
+    def _data_to_store(self) -> dict[str, Any]:
+        measurement = self._last_measurement
+        if measurement is not None:
+            measurement = dict(measurement)
+            measurement[DWD_MEASUREMENT_DATETIME] = measurement[
+                DWD_MEASUREMENT_DATETIME
+            ].isoformat()
+
+        return {
+            "measurement": measurement,
+            "measurement_etag": self._last_measurement_etag,
+            "measurement_last_modified": self._last_measurement_last_modified,
+            "forecast_etag": self._last_forecast_etag,
+            "forecast_last_modified": self._last_forecast_last_modified,
+            "forecast_content_id": self._last_forecast_content_id,
+            "schedules": {
+                "measurement": self._schedules[DWD_MEASUREMENT].as_dict(),
+                "forecast": self._schedules[DWD_FORECAST].as_dict(),
+            },
+        }
+
+    @callback
+    def _forecast_to_store(self) -> dict[str, Any]:
+        # Only saved when a new forecast was parsed, the validators are in the other store.
+        return {
+            "forecast": (
+                self._last_forecast.as_dict()
+                if self._last_forecast is not None
+                else None
+            ),
+            "forecast_content_id": self._last_forecast_content_id,
+            "forecast_elements": sorted(self._forecast_elements),
+        }
+
+
+async def async_remove_stored_data(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> None:
+    """Remove the stored data of a config entry."""
+    await _get_store(hass, config_entry, STORAGE_KEY).async_remove()
+    await _get_store(hass, config_entry, STORAGE_FORECAST_KEY).async_remove()
+
+
+def _get_store(hass: HomeAssistant, config_entry: ConfigEntry, key: str) -> Store:
+    return Store(
+        hass,
+        STORAGE_VERSION,
+        key.format(station_id=config_entry.data[CONF_STATION_ID]),
+    )
+
+
+def _get_phase(config_entry: ConfigEntry) -> float:
+    """Return a fixed phase between 0 and 1 for all polls of the config entry.
+
+    It's derived from the entry ID, which is random, so it stays the same after a restart, but
+    differs for the same station in different installations.
+    """
+    key = f"{config_entry.entry_id}:{config_entry.data.get(CONF_STATION_ID)}"
+    return zlib.crc32(key.encode()) / 0x100000000
+
+
+def _get_startup_stagger(hass: HomeAssistant) -> float:
+    """Return the offset in seconds of the first poll of the next config entry set up."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    index = domain_data.get(DATA_STARTUP_INDEX, 0)
+    domain_data[DATA_STARTUP_INDEX] = index + 1
+    return (index * STARTUP_STAGGER) % UPDATE_INTERVAL.total_seconds()
+
+
+def _get_conditional_headers(etag: str | None, last_modified: str | None) -> dict:
+    headers = {}
+    if etag is not None:
+        headers["If-None-Match"] = etag
+    if last_modified is not None:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+class _ResponseReader:
+    """Reads the content of a response from an executor thread.
+
+    Each read waits for the chunk from the event loop. Reading can be cancelled from the event
+    loop, which makes the pending read and all further reads raise CancelledError.
+    """
+
+    def __init__(
+        self, response: ClientResponse, loop: asyncio.AbstractEventLoop
+    ) -> None:
+        """Initialize."""
+
+        self._response: ClientResponse = response
+        self._loop: asyncio.AbstractEventLoop = loop
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._pending: concurrent.futures.Future[bytes] | None = None
+
+    def read(self, size: int) -> bytes:
+        """Read up to size bytes, blocking until they are received. Runs in the executor."""
+
+        with self._lock:
+            if self._cancelled.is_set():
+                raise concurrent.futures.CancelledError
+            self._pending = asyncio.run_coroutine_threadsafe(
+                self._response.content.read(size), self._loop
+            )
+        return self._pending.result()
+
+    def cancel(self) -> None:
+        """Cancel the pending and all further reads. Runs in the event loop."""
+
+        with self._lock:
+            self._cancelled.set()
+            if self._pending is not None:
+                self._pending.cancel()
+
+
+def _parse_forecast(
+    read: Callable[[int], bytes],
+    forecast_elements: frozenset[str],
+    last_content_id: tuple[int, int] | None,
+) -> tuple[MosmixForecast | None, tuple[int, int] | None, float]:
+    """Decompress and parse the forecast while it's read and measure how long it took.
+
+    Runs in the executor. If the content is the same as last_content_id, it is not parsed and
+    None is returned instead of the forecast. The time spent waiting for data is not included in
+    the duration.
+    """
+
+    waiting = 0.0
+
+    def timed_read(size: int) -> bytes:
+        nonlocal waiting
+        start = time.perf_counter()
+        data = read(size)
+        waiting += time.perf_counter() - start
+        return data
+
+    start = time.perf_counter()
+    stream = KmzStream(timed_read, FORECAST_MAX_SIZE)
+    if stream.content_id is not None and stream.content_id == last_content_id:
+        return None, last_content_id, 0.0
+    forecast = parse_kml(stream, forecast_elements)
+    return forecast, stream.content_id, time.perf_counter() - start - waiting
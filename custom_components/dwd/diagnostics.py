@@ -0,0 +1,38 @@
+"""Diagnostics support for DWD."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_SCHEDULER, DOMAIN
+from .coordinator import DwdDataUpdateCoordinator
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+
+    coordinator: DwdDataUpdateCoordinator = config_entry.runtime_data
+
+    return {
+        "data": dict(config_entry.data),
+        "options": dict(config_entry.options),
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "next_poll_times": {
+                str(product): x.isoformat()
+                for product, x in coordinator.next_poll_times.items()
+            },
+            "setup_duration": coordinator.setup_duration,
+            "first_refresh_duration": coordinator.first_refresh_duration,
+            "forecast_parse_duration": coordinator.forecast_parse_duration,
+            "forecast_parse_skipped": coordinator.forecast_parse_skipped,
+            "schedules": coordinator.get_schedule_diagnostics(),
+            "fetches": coordinator.get_fetch_diagnostics(),
+        },
+        "scheduler": hass.data[DOMAIN][DATA_SCHEDULER].as_diagnostics(),
+    }
@@ -0,0 +1,328 @@
+"""Parser for MOSMIX forecast data from DWD."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from collections.abc import Callable, Collection
+from datetime import datetime
+from io import RawIOBase
+from math import isnan, nan
+import struct
+from typing import IO, Any
+import zlib
+
+from defusedxml import ElementTree
+
+NAMESPACE_DWD = (
+    "https://opendata.dwd.de/weather/lib/pointforecast_dwd_extension_V1_0.xsd"
+)
+
+TAG_ISSUE_TIME = f"{{{NAMESPACE_DWD}}}IssueTime"
+TAG_TIME_STEP = f"{{{NAMESPACE_DWD}}}TimeStep"
+TAG_DEFAULT_UNDEF_SIGN = f"{{{NAMESPACE_DWD}}}DefaultUndefSign"
+TAG_FORECAST = f"{{{NAMESPACE_DWD}}}Forecast"
+TAG_VALUE = f"{{{NAMESPACE_DWD}}}value"
+ATTRIB_ELEMENT_NAME = f"{{{NAMESPACE_DWD}}}elementName"
+
+DEFAULT_UNDEF_SIGN = "-"
+
+# Local file header of a ZIP archive, see section 4.3.7 of
+# https://pkware.cachefly.net/webdocs/casestudies/APPNOTE.TXT
+LOCAL_FILE_HEADER = struct.Struct("<4sHHHHHIIIHH")
+LOCAL_FILE_HEADER_SIGNATURE = b"PK\x03\x04"
+DATA_DESCRIPTOR = struct.Struct("<III")
+DATA_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+FLAG_ENCRYPTED = 0x01
+FLAG_DATA_DESCRIPTOR = 0x08
+METHOD_STORED = 0
+METHOD_DEFLATED = 8
+
+KMZ_CHUNK_SIZE = 64 * 1024
+
+_EMPTY_COLUMN = array("d")
+
+
+class MosmixForecast:
+    """Forecast data from a MOSMIX file, stored column by column.
+
+    There is one column with the timestamps as seconds since the epoch and one float column per
+    forecast element, with NaN for missing values. The issue time is also in seconds since the
+    epoch, or None if it's unknown.
+    """
+
+    __slots__ = ("_elements", "issue_time", "timestamps")
+
+    def __init__(
+        self,
+        timestamps: array,
+        elements: dict[str, array],
+        issue_time: float | None = None,
+    ) -> None:
+        """Initialize."""
+        self.timestamps: array = timestamps
+        self._elements: dict[str, array] = elements
+        self.issue_time: float | None = issue_time
+
+    def __len__(self) -> int:
+        """Return the number of time steps."""
+        return len(self.timestamps)
+
+    def __contains__(self, name: str) -> bool:
+        """Return True, if the forecast contains the element with the given name."""
+        return name in self._elements
+
+    def get(self, name: str) -> array:
+        """Return the values of the forecast element, or an empty column if it's missing."""
+        return self._elements.get(name, _EMPTY_COLUMN)
+
+    def index_after(self, timestamp: float) -> int:
+        """Return the index of the first time step after the timestamp, or len() if there's none.
+
+        The time steps are sorted, so this is a binary search.
+        """
+        return bisect_right(self.timestamps, timestamp)
+
+    def window(self, timestamp: float, count: int | None = None) -> range:
+        """Return the indices of up to count time steps after the timestamp, or all if None."""
+        start = self.index_after(timestamp)
+        end = len(self.timestamps) if count is None else start + count
+        return range(start, min(end, len(self.timestamps)))
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the forecast as JSON serializable dictionary, with None for missing values."""
+        return {
+            "issue_time": self.issue_time,
+            "timestamps": self.timestamps.tolist(),
+            "elements": {
+                name: [None if isnan(x) else x for x in values]
+                for name, values in self._elements.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> MosmixForecast:
+        """Create a forecast from a dictionary as returned by as_dict."""
+        return cls(
+            array("d", data["timestamps"]),
+            {
+                name: array("d", (nan if x is None else x for x in values))
+                for name, values in data["elements"].items()
+            },
+            data.get("issue_time"),
+        )
+
+
+class KmzStream(RawIOBase):
+    """The KML file of a MOSMIX KMZ file, decompressed while it's being read.
+
+    A KMZ file is a ZIP archive, which contains a single KML file in case of MOSMIX. Instead of
+    the central directory at the end of the archive, the local file header at its beginning is
+    used, so the KML file can be decompressed chunk by chunk while the archive is still being
+    received. Neither the archive nor the KML file is ever held in memory as a whole.
+
+    The archive is read with the given function, which returns up to the given number of bytes and
+    an empty result at the end. A ValueError is raised for invalid archives, if the CRC or the size
+    don't match the local file header or the data descriptor or if the KML file is larger than
+    max_size bytes.
+    """
+
+    def __init__(self, read: Callable[[int], bytes], max_size: int) -> None:
+        """Initialize and read the local file header."""
+
+        super().__init__()
+        self._read = read
+        self._max_size = max_size
+
+        (
+            signature,
+            _,
+            flags,
+            method,
+            _,
+            _,
+            crc,
+            compressed_size,
+            size,
+            name_length,
+            extra_length,
+        ) = LOCAL_FILE_HEADER.unpack(self._read_exactly(LOCAL_FILE_HEADER.size))
+        if signature != LOCAL_FILE_HEADER_SIGNATURE:
+            raise ValueError("Not a KMZ file")
+        if flags & FLAG_ENCRYPTED:
+            raise ValueError("Encrypted KMZ files are not supported")
+        if method not in (METHOD_STORED, METHOD_DEFLATED):
+            raise ValueError(f"Compression method {method} is not supported")
+        if method == METHOD_STORED and flags & FLAG_DATA_DESCRIPTOR:
+            raise ValueError("Uncompressed KMZ files without size are not supported")
+
+        name = self._read_exactly(name_length).decode("cp437")
+        if not name.endswith(".kml"):
+            raise ValueError(f"Unexpected file {name} in KMZ file")
+        self._read_exactly(extra_length)
+
+        # With a data descriptor, the CRC and the sizes follow the compressed data, so they are
+        # only known at the end.
+        self._data_descriptor: bool = bool(flags & FLAG_DATA_DESCRIPTOR)
+        self._expected_crc: int | None = None
+        self._expected_size: int | None = None
+        if not self._data_descriptor:
+            if size > max_size:
+                raise ValueError(f"KML file too large ({size} bytes)")
+            self._expected_crc = crc
+            self._expected_size = size
+
+        self._decompressor = (
+            zlib.decompressobj(-zlib.MAX_WBITS) if method == METHOD_DEFLATED else None
+        )
+        self._remaining: int = compressed_size
+        self._input: bytes = b""
+        self._input_done: bool = False
+        self._crc: int = 0
+        self._size: int = 0
+        self._done: bool = False
+
+    @property
+    def content_id(self) -> tuple[int, int] | None:
+        """Return the CRC-32 and the size of the KML file, or None if they're not known yet.
+
+        They are usually known from the local file header, so before anything is decompressed.
+        """
+        if self._expected_crc is not None and self._expected_size is not None:
+            return self._expected_crc, self._expected_size
+        if self._done:
+            return self._crc, self._size
+        return None
+
+    def readable(self) -> bool:
+        """Return True, as the stream is readable."""
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        """Decompress up to len(buffer) bytes into buffer and return the number of bytes."""
+
+        while not self._done:
+            if not self._input and not self._input_done:
+                self._input = self._read(KMZ_CHUNK_SIZE)
+                self._input_done = not self._input
+
+            if self._decompressor is not None:
+                data = self._decompressor.decompress(self._input, len(buffer))
+                self._input = self._decompressor.unconsumed_tail
+                self._done = self._decompressor.eof
+                if not data and not self._done and self._input_done:
+                    raise ValueError("Unexpected end of KMZ file")
+            else:
+                if self._input_done and self._remaining:
+                    raise ValueError("Unexpected end of KMZ file")
+                data = self._input[: min(len(buffer), self._remaining)]
+                self._input = self._input[len(data) :]
+                self._remaining -= len(data)
+                self._done = self._remaining == 0
+
+            self._size += len(data)
+            if self._size > self._max_size:
+                raise ValueError(f"KML file larger than {self._max_size} bytes")
+            self._crc = zlib.crc32(data, self._crc)
+
+            if self._done:
+                if self._data_descriptor and self._decompressor is not None:
+                    self._read_data_descriptor(self._decompressor.unused_data)
+                self._verify()
+            if data:
+                buffer[: len(data)] = data
+                return len(data)
+
+        return 0
+
+    def _read_exactly(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self._read(size - len(data))
+            if not chunk:
+                raise ValueError("Unexpected end of KMZ file")
+            data += chunk
+        return data
+
+    def _read_data_descriptor(self, data: bytes) -> None:
+        # The data descriptor directly follows the compressed data, so it starts with what the
+        # decompressor didn't use. Its signature is optional.
+        size = len(DATA_DESCRIPTOR_SIGNATURE)
+        data += self._read_exactly(max(0, size - len(data)))
+        if data.startswith(DATA_DESCRIPTOR_SIGNATURE):
+            data = data[size:]
+        data += self._read_exactly(max(0, DATA_DESCRIPTOR.size - len(data)))
+        self._expected_crc, _, self._expected_size = DATA_DESCRIPTOR.unpack_from(data)
+
+    def _verify(self) -> None:
+        if self._expected_size is not None and self._size != self._expected_size:
+            raise ValueError("Size of KML file does not match")
+        if self._expected_crc is not None and self._crc != self._expected_crc:
+            raise ValueError("CRC of KML file does not match")
+
+
+def parse_kml(
+    kml_file: IO[bytes], element_names: Collection[str] | None = None
+) -> MosmixForecast:
+    """Parse a MOSMIX KML file.
+
+    If element_names is given, only these forecast elements are parsed, all others are skipped.
+
+    The file is parsed as a stream and every element is cleared as soon as it has been processed,
+    so the XML tree is never completely held in memory.
+    """
+
+    # For a description of all elements see https://opendata.dwd.de/weather/lib/MetElementDefinition.xml
+
+    timestamps = array("d")
+    elements = {}
+    issue_time = None
+
+    undef_sign = DEFAULT_UNDEF_SIGN
+    element_name = None
+
+    for event, element in ElementTree.iterparse(kml_file, events=("start", "end")):
+        tag = element.tag
+
+        if event == "start":
+            # The name is an attribute of the forecast element, which is already available at
+            # its start, the values follow in a child element.
+            if tag == TAG_FORECAST:
+                element_name = element.attrib.get(ATTRIB_ELEMENT_NAME)
+                if element_names is not None and element_name not in element_names:
+                    element_name = None
+            continue
+
+        if tag == TAG_TIME_STEP:
+            timestamps.append(_parse_time(element.text))
+        elif tag == TAG_ISSUE_TIME:
+            if element.text:
+                issue_time = _parse_time(element.text)
+        elif tag == TAG_DEFAULT_UNDEF_SIGN:
+            if element.text:
+                undef_sign = element.text.strip()
+        elif tag == TAG_VALUE:
+            if element_name is not None and element.text is not None:
+                # Converting the values once here saves converting them over and over again
+                # whenever the forecast is calculated.
+                elements[element_name] = array(
+                    "d",
+                    (
+                        nan if x == undef_sign else float(x)
+                        for x in element.text.split()
+                    ),
+                )
+        elif tag == TAG_FORECAST:
+            element_name = None
+
+        # All children have already been processed at the end of an element, so nothing of it is
+        # needed anymore.
+        element.clear()
+
+    return MosmixForecast(timestamps, elements, issue_time)
+
+
+def _parse_time(text: str) -> float:
+    """Return a time like 2024-11-24T06:00:00.000Z in seconds since the epoch."""
+    # This is many times faster than strptime and handles the Z suffix since Python 3.11.
+    return datetime.fromisoformat(text.strip()).timestamp()
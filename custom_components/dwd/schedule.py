@@ -0,0 +1,247 @@
+"""Scheduling of polls based on when DWD publishes new data."""
+
+from __future__ import annotations
+
+from collections import deque
+from datetime import UTC, datetime
+import random
+from statistics import median
+from typing import Any
+
+from .const import (
+    BACKOFF_MAX,
+    BACKOFF_MIN,
+    CIRCUIT_BREAKER_THRESHOLD,
+    CIRCUIT_BREAKER_TIMEOUT,
+    POLL_JITTER,
+    POLL_INTERVAL_DENSE,
+    POLL_INTERVAL_MAX,
+    POLL_INTERVAL_MIN,
+    POLL_WINDOW_AFTER,
+    POLL_WINDOW_BEFORE,
+    SCHEDULE_HISTORY,
+    UPDATE_INTERVAL,
+)
+
+
+class DwdPollSchedule:
+    """Learns when a product is published and decides when to poll it next.
+
+    DWD publishes each product in a regular cadence, e.g. measurements every hour and MOSMIX_L
+    forecasts every six hours, some time after the issue time of the data. The cadence is learned
+    from the issue times and the delay from the Last-Modified headers. Polls are dense in a window
+    around the expected publication and rare in between.
+
+    Failed polls are retried with exponential backoff instead.
+
+    All times are in seconds since the epoch. The phase between 0 and 1 spreads the polls of
+    different stations: it shifts the start of the window by up to POLL_JITTER seconds and the
+    polls outside of it by up to their whole interval, so they don't all happen at once.
+    """
+
+    def __init__(self, default_interval: float, phase: float = 0.0) -> None:
+        """Initialize."""
+
+        self._default_interval: float = default_interval
+        self.phase: float = phase
+        self._issue_times: deque[float] = deque(maxlen=SCHEDULE_HISTORY)
+        self._delays: deque[float] = deque(maxlen=SCHEDULE_HISTORY)
+
+        self.last_poll: float | None = None
+        self.last_success: float | None = None
+        self.failures: int = 0
+        # Nothing is known yet, so poll right away.
+        self.next_poll: float = 0.0
+
+    @property
+    def interval(self) -> float:
+        """Return the interval in which new data is issued."""
+
+        intervals = [
+            y - x for x, y in zip(self._issue_times, list(self._issue_times)[1:])
+        ]
+        if not intervals:
+            return self._default_interval
+        # The median ignores single missing or additional releases.
+        return median(intervals)
+
+    @property
+    def jitter(self) -> float:
+        """Return the offset in seconds of the start of the poll window."""
+        return self.phase * POLL_JITTER
+
+    @property
+    def delay(self) -> float:
+        """Return the delay between the issue time and the publication of new data."""
+        if not self._delays:
+            return 0.0
+        return median(self._delays)
+
+    @property
+    def expected_publication(self) -> float | None:
+        """Return when the next new data is expected to be published, if known."""
+        if not self._issue_times:
+            return None
+        return self._issue_times[-1] + self.interval + self.delay
+
+    def is_fresh(self, now: float) -> bool:
+        """Return whether the data of the last successful poll is probably still the latest."""
+
+        last = self.last_success
+        if last is None and self._issue_times:
+            last = self._issue_times[-1]
+        if last is None or now - last >= self.interval:
+            return False
+
+        expected = self.expected_publication
+        return expected is None or now < expected
+
+    def record_poll(
+        self, now: float, issue_time: float | None, last_modified: float | None
+    ) -> None:
+        """Record a successful poll with the issue time of the data and its publication time."""
+
+        self.last_poll = now
+        self.last_success = now
+        self.failures = 0
+
+        if issue_time is None:
+            issue_time = last_modified
+
+        if issue_time is not None and (
+            not self._issue_times or issue_time > self._issue_times[-1]
+        ):
+            self._issue_times.append(issue_time)
+            if last_modified is not None and last_modified >= issue_time:
+                self._delays.append(last_modified - issue_time)
+
+        self.next_poll = self._get_next_poll(now)
+
+    def record_failure(self, now: float) -> None:
+        """Record a failed poll."""
+        self.last_poll = now
+        self.failures += 1
+
+        # The random jitter keeps the retries of different stations apart, which would otherwise
+        # all fail and retry at the same time during an outage.
+        backoff = min(BACKOFF_MAX, BACKOFF_MIN * 2 ** (self.failures - 1))
+        self.next_poll = now + backoff / 2 + random.uniform(0, backoff / 2)
+
+    def _get_next_poll(self, now: float) -> float:
+        expected = self.expected_publication
+
+        if expected is None:
+            return self._get_slot(now, UPDATE_INTERVAL.total_seconds())
+
+        if now < expected - POLL_WINDOW_BEFORE:
+            # Wait for the window, but check now and then anyway in case the cadence changed.
+            return min(
+                expected - POLL_WINDOW_BEFORE + self.jitter, now + POLL_INTERVAL_MAX
+            )
+
+        if now < expected + POLL_WINDOW_AFTER:
+            return now + POLL_INTERVAL_DENSE
+
+        # The publication is overdue, maybe it's just late or the cadence changed.
+        return self._get_slot(now, UPDATE_INTERVAL.total_seconds())
+
+    def _get_slot(self, now: float, interval: float) -> float:
+        # The next slot of a fixed grid shifted by the phase, so the offset stays the same instead
+        # of adding up with each poll, and the stations are spread over the whole interval.
+        slot = now + interval - (now - self.phase * interval) % interval
+        if slot < now + POLL_INTERVAL_MIN:
+            slot += interval
+        return slot
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return what has been learned as JSON serializable dictionary."""
+        return {
+            "issue_times": list(self._issue_times),
+            "delays": list(self._delays),
+            "last_success": self.last_success,
+        }
+
+    def restore(self, data: dict[str, Any]) -> None:
+        """Restore what has been learned from a dictionary as returned by as_dict."""
+        self._issue_times.clear()
+        self._issue_times.extend(float(x) for x in data["issue_times"])
+        self._delays.clear()
+        self._delays.extend(float(x) for x in data["delays"])
+        self.last_success = data.get("last_success")
+
+    def as_diagnostics(self) -> dict[str, Any]:
+        """Return the state of the schedule for diagnostics."""
+        return {
+            "interval": self.interval,
+            "phase": self.phase,
+            "jitter": self.jitter,
+            "delay": self.delay,
+            "expected_publication": _to_iso(self.expected_publication),
+            "last_poll": _to_iso(self.last_poll),
+            "last_success": _to_iso(self.last_success),
+            "failures": self.failures,
+            "next_poll": _to_iso(self.next_poll or None),
+        }
+
+
+class DwdCircuitBreaker:
+    """Stops requesting a product that keeps failing for all stations.
+
+    After CIRCUIT_BREAKER_THRESHOLD consecutive failures the circuit opens and no requests are made
+    for CIRCUIT_BREAKER_TIMEOUT seconds. After that, a single request is let through, which closes
+    the circuit again if it succeeds or keeps it open for another timeout if it fails.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.failures: int = 0
+        self.opened: float | None = None
+        self._probing: bool = False
+
+    @property
+    def state(self) -> str:
+        """Return the state of the circuit, closed, open or half_open."""
+        if self.opened is None:
+            return "closed"
+        return "half_open" if self._probing else "open"
+
+    def allow(self, now: float) -> bool:
+        """Return True, if a request may be made now."""
+        if self.opened is None:
+            return True
+        if self._probing or now < self.opened + CIRCUIT_BREAKER_TIMEOUT:
+            return False
+        self._probing = True
+        return True
+
+    def record_inconclusive(self) -> None:
+        """Record a request that was allowed, but says nothing about the server.
+
+        This is the case if it failed for reasons specific to a single station or was cancelled.
+        """
+        self._probing = False
+
+    def record(self, success: bool, now: float) -> None:
+        """Record the result of a request that was allowed."""
+        self._probing = False
+        if success:
+            self.failures = 0
+            self.opened = None
+            return
+        self.failures += 1
+        if self.opened is not None or self.failures >= CIRCUIT_BREAKER_THRESHOLD:
+            self.opened = now
+
+    def as_diagnostics(self) -> dict[str, Any]:
+        """Return the state of the circuit breaker for diagnostics."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened": _to_iso(self.opened),
+        }
+
+
+def _to_iso(timestamp: float | None) -> str | None:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, UTC).isoformat()
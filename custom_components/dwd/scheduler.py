@@ -0,0 +1,208 @@
+"""Domain wide scheduler of all fetches from DWD."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+import logging
+from statistics import median
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, DWD_FORECAST, DWD_MEASUREMENT, FETCH_HISTORY
+from .schedule import DwdCircuitBreaker
+
+if TYPE_CHECKING:
+    from .coordinator import DwdDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DwdFetchScheduler:
+    """Owns the timer and the connection pool for all config entries.
+
+    A single timer refreshes the coordinators whose data is due, earliest first, instead of one
+    timer per coordinator. The fetches themselves run through a pool with a limited number of
+    concurrent fetches. Fetches that have to wait for the pool get their turn in the order they
+    arrived, so no config entry can starve the others.
+    """
+
+    def __init__(self, hass: HomeAssistant, limit: int) -> None:
+        """Initialize."""
+
+        self._hass: HomeAssistant = hass
+        self.limit: int = limit
+
+        self._coordinators: set[DwdDataUpdateCoordinator] = set()
+        self._refreshing: set[DwdDataUpdateCoordinator] = set()
+        self._unsub_timer: CALLBACK_TYPE | None = None
+        self._next_run: float | None = None
+        self._job = HassJob(self._async_handle_timer, f"{DOMAIN} scheduler")
+
+        # The DWD server is the same for all stations, so if it's down, it's down for all of them.
+        self._circuit_breakers: dict[int, DwdCircuitBreaker] = {
+            DWD_MEASUREMENT: DwdCircuitBreaker(),
+            DWD_FORECAST: DwdCircuitBreaker(),
+        }
+
+        self._active: int = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+        # Seconds that the recent fetches waited for the pool, and the most fetches waiting at
+        # once, for diagnostics.
+        self._wait_times: deque[float] = deque(maxlen=FETCH_HISTORY)
+        self.max_queue_depth: int = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of fetches waiting for the pool."""
+        return len(self._waiters)
+
+    def get_circuit_breaker(self, product: int) -> DwdCircuitBreaker:
+        """Return the circuit breaker for a product."""
+        return self._circuit_breakers[product]
+
+    @callback
+    def async_add(self, coordinator: DwdDataUpdateCoordinator) -> CALLBACK_TYPE:
+        """Add a coordinator to be refreshed when due and return a callback to remove it."""
+
+        self._coordinators.add(coordinator)
+        self.async_schedule()
+
+        @callback
+        def remove() -> None:
+            self._coordinators.discard(coordinator)
+            self.async_schedule()
+
+        return remove
+
+    @callback
+    def async_schedule(self) -> None:
+        """Set the timer to the next poll of all coordinators."""
+
+        next_polls = [
+            x.next_poll
+            for x in self._coordinators
+            if x.next_poll is not None and x not in self._refreshing
+        ]
+        next_run = min(next_polls) if next_polls else None
+        if next_run == self._next_run and self._unsub_timer is not None:
+            return
+
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._next_run = next_run
+        if next_run is not None:
+            self._unsub_timer = async_call_later(
+                self._hass, max(0.0, next_run - time.time()), self._job
+            )
+
+    @callback
+    def _async_handle_timer(self, _now: datetime) -> None:
+        self._unsub_timer = None
+        self._next_run = None
+        if self._hass.is_stopping:
+            return
+
+        now = time.time()
+        due = sorted(
+            (
+                x
+                for x in self._coordinators
+                if x.next_poll is not None
+                and x.next_poll <= now
+                and x not in self._refreshing
+            ),
+            key=lambda x: x.next_poll,
+        )
+        _LOGGER.debug(
+            "Refreshing %d of %d coordinators, %d fetches waiting for the pool",
+            len(due),
+            len(self._coordinators),
+            self.queue_depth,
+        )
+        for coordinator in due:
+            self._refreshing.add(coordinator)
+            self._hass.async_create_background_task(
+                self._async_refresh(coordinator), f"{DOMAIN} refresh"
+            )
+
+        self.async_schedule()
+
+    async def _async_refresh(self, coordinator: DwdDataUpdateCoordinator) -> None:
+        try:
+            await coordinator.async_refresh()
+        finally:
+            self._refreshing.discard(coordinator)
+            self.async_schedule()
+
+    @asynccontextmanager
+    async def async_slot(self) -> AsyncIterator[None]:
+        """Wait for a free slot in the pool and hold it while the context is active."""
+
+        start = time.monotonic()
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+        else:
+            waiter = self._hass.loop.create_future()
+            self._waiters.append(waiter)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.cancelled():
+                    self._waiters.remove(waiter)
+                else:
+                    # The slot was already handed over, so it has to be passed on.
+                    self._release()
+                raise
+        self._wait_times.append(time.monotonic() - start)
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        # The slot is handed over directly to the fetch that has been waiting the longest.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def as_diagnostics(self) -> dict[str, Any]:
+        """Return the state of the scheduler for diagnostics."""
+
+        wait_times = sorted(self._wait_times)
+
+        return {
+            "limit": self.limit,
+            "coordinators": len(self._coordinators),
+            "refreshing": len(self._refreshing),
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "next_run": datetime.fromtimestamp(self._next_run, UTC).isoformat()
+            if self._next_run is not None
+            else None,
+            "circuit_breakers": {
+                "measurement": self._circuit_breakers[DWD_MEASUREMENT].as_diagnostics(),
+                "forecast": self._circuit_breakers[DWD_FORECAST].as_diagnostics(),
+            },
+            "wait_time": {
+                "median": median(wait_times),
+                "p90": wait_times[int(0.9 * (len(wait_times) - 1))],
+                "max": wait_times[-1],
+            }
+            if wait_times
+            else None,
+        }
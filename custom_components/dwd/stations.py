@@ -0,0 +1,524 @@
+"""Catalog of the stations known to the DWD component."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator, Sequence
+import heapq
+import json
+import logging
+from math import asin, cos, pi, radians, sin, sqrt
+import os
+import re
+import struct
+import sys
+
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_STATION_CATALOG, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STATIONS_JSON = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "stations.json"
+)
+STATIONS_BIN = os.path.join(os.path.dirname(os.path.realpath(__file__)), "stations.bin")
+
+# Format of stations.bin, see also tools/generate_stations/generate_stations.py. After the header
+# follow the columns, each with one little-endian value per station: latitude, longitude and
+# altitude as double, the indices of ID and name in the string table as uint32, the flags and the
+# source as uint8. At the end is the string table with all distinct strings as UTF-8, separated
+# by NUL characters.
+BINARY_MAGIC = b"DWDS"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sHII")
+BINARY_COLUMNS = ("d", "d", "d", "I", "I", "B", "B")
+BINARY_ITEM_SIZES = {"d": 8, "I": 4, "B": 1}
+
+FLAG_MEASUREMENT = 1
+FLAG_FORECAST = 2
+
+_TOKEN_RE = re.compile(r"\w+")
+_SEARCH_TRANSLATION = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+# Sorts after any token starting with the same prefix.
+_MAX_CHAR = chr(0x10FFFF)
+
+# Mean radius of the earth in km.
+EARTH_RADIUS = 6371.0088
+
+
+class DwdStation:
+    """A station from the station catalog."""
+
+    __slots__ = (
+        "altitude",
+        "forecast",
+        "id",
+        "latitude",
+        "longitude",
+        "measurement",
+        "name",
+        "source",
+    )
+
+    def __init__(
+        self,
+        station_id: str,
+        name: str,
+        latitude: float,
+        longitude: float,
+        altitude: float,
+        measurement: bool,
+        forecast: bool,
+        source: int,
+    ) -> None:
+        """Initialize."""
+        self.id: str = station_id
+        self.name: str = name
+        self.latitude: float = latitude
+        self.longitude: float = longitude
+        self.altitude: float = altitude
+        self.measurement: bool = measurement
+        self.forecast: bool = forecast
+        self.source: int = source
+
+
+class DwdStationIndex:
+    """Spatial index over the station coordinates to find stations by location.
+
+    This is a k-d tree over the positions of the stations as unit vectors in 3D. The straight
+    line distance between them grows monotonically with the great circle distance, so the tree
+    can be searched with it, without any special handling of the poles or the antimeridian.
+    Distances are calculated for a spherical earth. Stations are referred to by their position
+    in the coordinate columns the index was built from.
+    """
+
+    def __init__(self, latitudes: Sequence[float], longitudes: Sequence[float]) -> None:
+        """Build the index."""
+
+        # The coordinates of the unit vectors are stored in one column per axis.
+        self._axes: tuple[array, array, array] = (array("d"), array("d"), array("d"))
+        for latitude, longitude in zip(latitudes, longitudes):
+            for column, value in zip(self._axes, _to_unit_vector(latitude, longitude)):
+                column.append(value)
+
+        # The nodes of the tree are stored in parallel columns, indexed by the node number. Each
+        # node is a station (by its index), the axis it splits and its children (-1 for none).
+        self._node_station: array = array("i")
+        self._node_axis: array = array("b")
+        self._node_left: array = array("i")
+        self._node_right: array = array("i")
+        self._root: int = self._build(list(range(len(latitudes))), 0)
+
+    def _build(self, indices: list[int], depth: int) -> int:
+        if not indices:
+            return -1
+
+        axis = depth % 3
+        indices.sort(key=self._axes[axis].__getitem__)
+        median = len(indices) // 2
+
+        node = len(self._node_station)
+        self._node_station.append(indices[median])
+        self._node_axis.append(axis)
+        self._node_left.append(-1)
+        self._node_right.append(-1)
+
+        self._node_left[node] = self._build(indices[:median], depth + 1)
+        self._node_right[node] = self._build(indices[median + 1 :], depth + 1)
+        return node
+
+    def nearest(
+        self, latitude: float, longitude: float, count: int
+    ) -> list[tuple[int, float]]:
+        """Return the given number of stations nearest to the location with their distance.
+
+        The distance is in km and the result is sorted by it.
+        """
+
+        if count <= 0:
+            return []
+
+        point = _to_unit_vector(latitude, longitude)
+        # Max heap (by negated squared chord length) of the nearest stations found so far.
+        heap: list[tuple[float, int]] = []
+
+        def search(node: int) -> None:
+            while node != -1:
+                station = self._node_station[node]
+                chord2 = self._chord2(point, station)
+                if len(heap) < count:
+                    heapq.heappush(heap, (-chord2, station))
+                elif chord2 < -heap[0][0]:
+                    heapq.heapreplace(heap, (-chord2, station))
+
+                axis = self._node_axis[node]
+                delta = point[axis] - self._axes[axis][station]
+                if delta < 0:
+                    near, far = self._node_left[node], self._node_right[node]
+                else:
+                    near, far = self._node_right[node], self._node_left[node]
+
+                search(near)
+
+                # The other side can only contain nearer stations, if the splitting plane is
+                # nearer than the furthest station found so far.
+                if len(heap) < count or delta * delta < -heap[0][0]:
+                    node = far
+                else:
+                    node = -1
+
+        search(self._root)
+
+        return [
+            (station, _chord2_to_km(-chord2))
+            for chord2, station in sorted(heap, reverse=True)
+        ]
+
+    def within(
+        self, latitude: float, longitude: float, radius: float
+    ) -> list[tuple[int, float]]:
+        """Return all stations within the radius in km around the location with their distance.
+
+        The distance is in km and the result is sorted by it.
+        """
+
+        if radius < 0:
+            return []
+
+        point = _to_unit_vector(latitude, longitude)
+        # Nothing is further away than the opposite side of the earth.
+        max_chord2 = _km_to_chord2(min(radius, pi * EARTH_RADIUS))
+        result: list[tuple[float, int]] = []
+
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node == -1:
+                continue
+
+            station = self._node_station[node]
+            chord2 = self._chord2(point, station)
+            if chord2 <= max_chord2:
+                result.append((chord2, station))
+
+            axis = self._node_axis[node]
+            delta = point[axis] - self._axes[axis][station]
+            if delta < 0 or delta * delta <= max_chord2:
+                stack.append(self._node_left[node])
+            if delta >= 0 or delta * delta <= max_chord2:
+                stack.append(self._node_right[node])
+
+        result.sort()
+        return [(station, _chord2_to_km(chord2)) for chord2, station in result]
+
+    def _chord2(self, point: tuple[float, float, float], station: int) -> float:
+        """Return the squared straight line distance between the point and the station."""
+        x, y, z = self._axes
+        dx = point[0] - x[station]
+        dy = point[1] - y[station]
+        dz = point[2] - z[station]
+        return dx * dx + dy * dy + dz * dz
+
+
+def _to_unit_vector(latitude: float, longitude: float) -> tuple[float, float, float]:
+    lat = radians(latitude)
+    lon = radians(longitude)
+    return (cos(lat) * cos(lon), cos(lat) * sin(lon), sin(lat))
+
+
+def _chord2_to_km(chord2: float) -> float:
+    return 2 * EARTH_RADIUS * asin(min(sqrt(chord2) / 2, 1.0))
+
+
+def _km_to_chord2(distance: float) -> float:
+    return (2 * sin(distance / (2 * EARTH_RADIUS))) ** 2
+
+
+def _tokenize(text: str) -> list[str]:
+    """Split the text into normalized words for searching.
+
+    Umlauts are replaced, so that e.g. "Koeln" and "Köln" find the same stations.
+    """
+    return _TOKEN_RE.findall(text.casefold().translate(_SEARCH_TRANSLATION))
+
+
+class DwdStationCatalog:
+    """All stations from stations.bin or stations.json, with an index by station ID.
+
+    The catalog is loaded only once and then shared by all config and options flows, see
+    async_get_station_catalog. Stations can be found by their ID or by location via the index.
+
+    The stations are kept as parallel columns in catalog order, DwdStation records are only
+    created for the stations that are actually requested.
+    """
+
+    def __init__(
+        self,
+        ids: list[str],
+        names: list[str],
+        latitudes: array,
+        longitudes: array,
+        altitudes: array,
+        flags: array,
+        sources: array,
+    ) -> None:
+        """Initialize."""
+
+        self._ids: list[str] = ids
+        self._names: list[str] = names
+        self.latitudes: array = latitudes
+        self.longitudes: array = longitudes
+        self.altitudes: array = altitudes
+        self._flags: array = flags
+        self._sources: array = sources
+
+        self._indices_by_id: dict[str, int] = {x: i for i, x in enumerate(ids)}
+        self.index: DwdStationIndex = DwdStationIndex(latitudes, longitudes)
+
+        # Index for the search by name or ID. All distinct tokens of names and IDs are sorted, so
+        # that all tokens starting with a prefix can be found by bisection, with the positions of
+        # their stations in a parallel column.
+        search_entries = sorted(
+            (token, i)
+            for i, (station_id, name) in enumerate(zip(ids, names))
+            for token in {*_tokenize(name), *_tokenize(station_id)}
+        )
+        self._search_tokens: list[str] = [x[0] for x in search_entries]
+        self._search_stations: array = array("i", (x[1] for x in search_entries))
+
+        # Precomputed, so that distances to many stations can be calculated in one go.
+        self._latitudes_radians: array = array("d", map(radians, latitudes))
+        self._longitudes_radians: array = array("d", map(radians, longitudes))
+        self._latitudes_cos: array = array("d", map(cos, self._latitudes_radians))
+
+    def __len__(self) -> int:
+        """Return the number of stations."""
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[DwdStation]:
+        """Iterate over all stations in catalog order."""
+        return map(self._station, range(len(self._ids)))
+
+    def get(self, station_id: str) -> DwdStation | None:
+        """Return the station with the given ID, or None if it's unknown."""
+        index = self._indices_by_id.get(station_id)
+        if index is None:
+            return None
+        return self._station(index)
+
+    def nearest(
+        self, latitude: float, longitude: float, count: int
+    ) -> list[tuple[DwdStation, float]]:
+        """Return the given number of stations nearest to the location with their distance.
+
+        The distance is in km and the result is sorted by it.
+        """
+        return [
+            (self._station(index), distance)
+            for index, distance in self.index.nearest(latitude, longitude, count)
+        ]
+
+    def within(
+        self, latitude: float, longitude: float, radius: float
+    ) -> list[tuple[DwdStation, float]]:
+        """Return all stations within the radius in km around the location with their distance.
+
+        The distance is in km and the result is sorted by it.
+        """
+        return [
+            (self._station(index), distance)
+            for index, distance in self.index.within(latitude, longitude, radius)
+        ]
+
+    def distances(
+        self, latitude: float, longitude: float, indices: Iterable[int]
+    ) -> array:
+        """Return the distances in km from the location to the stations at the given positions.
+
+        The distances are calculated with the haversine formula for a spherical earth, in one
+        pass over the columns of the catalog, and returned in the order of indices.
+        """
+
+        lat = radians(latitude)
+        lon = radians(longitude)
+        lat_cos = cos(lat)
+        factor = 2 * EARTH_RADIUS
+        latitudes = self._latitudes_radians
+        longitudes = self._longitudes_radians
+        latitudes_cos = self._latitudes_cos
+
+        return array(
+            "d",
+            (
+                factor
+                * asin(
+                    min(
+                        sqrt(
+                            sin((latitudes[i] - lat) / 2) ** 2
+                            + lat_cos
+                            * latitudes_cos[i]
+                            * sin((longitudes[i] - lon) / 2) ** 2
+                        ),
+                        1.0,
+                    )
+                )
+                for i in indices
+            ),
+        )
+
+    def search(
+        self, query: str, latitude: float, longitude: float, count: int
+    ) -> list[tuple[DwdStation, float]]:
+        """Return the stations best matching the query with their distance to the location.
+
+        A station matches, if each word of the query is the start of a word of its name or ID.
+        Exact matches of the ID or name come first, then names starting with the query, then all
+        others. Within each of these groups, nearer stations come first. The distance is in km.
+        """
+
+        query_tokens = _tokenize(query)
+        if not query_tokens or count <= 0:
+            return []
+
+        matches: set[int] | None = None
+        for token in query_tokens:
+            start = bisect_left(self._search_tokens, token)
+            end = bisect_left(self._search_tokens, token + _MAX_CHAR, start)
+            token_matches = set(self._search_stations[start:end])
+            matches = token_matches if matches is None else matches & token_matches
+            if not matches:
+                return []
+
+        normalized_query = " ".join(query_tokens)
+
+        def rank(index: int) -> int:
+            name = " ".join(_tokenize(self._names[index]))
+            if " ".join(_tokenize(self._ids[index])) == normalized_query:
+                return 0
+            if name == normalized_query:
+                return 1
+            if name.startswith(normalized_query):
+                return 2
+            return 3
+
+        indices = list(matches)
+        distances = self.distances(latitude, longitude, indices)
+        best = sorted(zip(map(rank, indices), distances, indices))[:count]
+
+        return [(self._station(index), distance) for _, distance, index in best]
+
+    def _station(self, index: int) -> DwdStation:
+        flags = self._flags[index]
+        return DwdStation(
+            self._ids[index],
+            self._names[index],
+            self.latitudes[index],
+            self.longitudes[index],
+            self.altitudes[index],
+            bool(flags & FLAG_MEASUREMENT),
+            bool(flags & FLAG_FORECAST),
+            self._sources[index],
+        )
+
+    @classmethod
+    def load(cls) -> DwdStationCatalog:
+        """Load the catalog from stations.bin, or stations.json if it's not available.
+
+        This is blocking I/O.
+        """
+
+        try:
+            return cls.load_binary(STATIONS_BIN)
+        except (OSError, ValueError) as err:
+            _LOGGER.debug(
+                "Could not load %s, falling back to %s: %s",
+                STATIONS_BIN,
+                STATIONS_JSON,
+                err,
+            )
+            return cls.load_json(STATIONS_JSON)
+
+    @classmethod
+    def load_json(cls, path: str) -> DwdStationCatalog:
+        """Load the catalog from a JSON file. This is blocking I/O."""
+
+        with open(path, encoding="utf-8") as file:
+            stations = json.load(file)
+
+        return cls(
+            [x["id"] for x in stations],
+            [x["name"] for x in stations],
+            array("d", (x["latitude"] for x in stations)),
+            array("d", (x["longitude"] for x in stations)),
+            array("d", (x["altitude"] for x in stations)),
+            array(
+                "B",
+                (
+                    (FLAG_MEASUREMENT if x["measurement"] else 0)
+                    | (FLAG_FORECAST if x["forecast"] else 0)
+                    for x in stations
+                ),
+            ),
+            array("B", (x["source"] for x in stations)),
+        )
+
+    @classmethod
+    def load_binary(cls, path: str) -> DwdStationCatalog:
+        """Load the catalog from a binary file as written by generate_stations.py.
+
+        The numeric columns are copied as they are and all strings are decoded in one go, so
+        there is hardly anything to parse. This is blocking I/O.
+        """
+
+        with open(path, "rb") as file:
+            data = file.read()
+
+        if len(data) < BINARY_HEADER.size:
+            raise ValueError("File too short")
+        magic, version, count, strings_size = BINARY_HEADER.unpack_from(data)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise ValueError(f"Unsupported format {magic!r} version {version}")
+
+        offset = BINARY_HEADER.size
+        columns = []
+        for typecode in BINARY_COLUMNS:
+            column = array(typecode)
+            if column.itemsize != BINARY_ITEM_SIZES[typecode]:
+                raise ValueError(f"Unsupported item size for {typecode}")
+            size = count * column.itemsize
+            column.frombytes(data[offset : offset + size])
+            if sys.byteorder != "little":
+                column.byteswap()
+            columns.append(column)
+            offset += size
+
+        if len(data) != offset + strings_size:
+            raise ValueError("Unexpected file size")
+        strings = data[offset:].decode("utf-8").split("\0")
+
+        latitudes, longitudes, altitudes, ids, names, flags, sources = columns
+        return cls(
+            [strings[x] for x in ids],
+            [strings[x] for x in names],
+            latitudes,
+            longitudes,
+            altitudes,
+            flags,
+            sources,
+        )
+
+
+async def async_get_station_catalog(hass: HomeAssistant) -> DwdStationCatalog:
+    """Return the station catalog, which is loaded on first use."""
+
+    domain_data = hass.data.setdefault(DOMAIN, {})
+
+    catalog = domain_data.get(DATA_STATION_CATALOG)
+    if catalog is None:
+        catalog = await hass.async_add_executor_job(DwdStationCatalog.load)
+        # Another flow may have loaded it in the meantime, only one of them is kept.
+        catalog = domain_data.setdefault(DATA_STATION_CATALOG, catalog)
+
+    return catalog
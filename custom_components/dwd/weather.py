@@ -2,15 +2,16 @@
 
 from __future__ import annotations
 
+from bisect import bisect_right
+from collections.abc import Iterable
 from datetime import UTC, date, datetime, time, timedelta
-from enum import Enum
 import logging
+from math import isnan
 from typing import Any
 
 from homeassistant.components.weather import (
     ATTR_CONDITION_CLEAR_NIGHT,
     ATTR_CONDITION_CLOUDY,
-    ATTR_CONDITION_FOG,
     ATTR_CONDITION_HAIL,
     ATTR_CONDITION_LIGHTNING,
     ATTR_CONDITION_LIGHTNING_RAINY,
@@ -40,6 +41,8 @@ from homeassistant.components.weather import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
+    SUN_EVENT_SUNRISE,
+    SUN_EVENT_SUNSET,
     UnitOfLength,
     UnitOfPressure,
     UnitOfSpeed,
@@ -50,12 +53,15 @@ from homeassistant.helpers import entity_registry as er, sun
 from homeassistant.helpers.device_registry import DeviceEntryType
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_utc_time_change
 from homeassistant.util import dt as dt_util
 
 from .const import (
+    ATTR_STALE_AGE,
     ATTRIBUTION,
     CONDITION_CLOUDY_THRESHOLD,
     CONDITION_PARTLYCLOUDY_THRESHOLD,
+    CONDITION_SUNNY_OR_CLEAR_NIGHT,
     CONDITIONS_MAP,
     CONF_CURRENT_WEATHER,
     CONF_CURRENT_WEATHER_DEFAULT,
@@ -64,9 +70,9 @@ from .const import (
     CONF_CURRENT_WEATHER_MEASUREMENT,
     CONF_FORECAST,
     CONF_FORECAST_DEFAULT,
+    DATA_SUN_CACHE,
     DOMAIN,
     DWD_FORECAST,
-    DWD_FORECAST_TIMESTAMP,
     DWD_MEASUREMENT,
     DWD_MEASUREMENT_CLOUD_COVER_TOTAL,
     DWD_MEASUREMENT_DEW_POINT,
@@ -78,19 +84,15 @@ from .const import (
     DWD_MEASUREMENT_PRESSURE,
     DWD_MEASUREMENT_TEMPERATURE,
     DWD_MEASUREMENT_VISIBILITY,
+    SUN_CACHE_DAYS,
+    WW_CONDITIONS,
 )
 from .coordinator import DwdDataUpdateCoordinator
+from .mosmix import MosmixForecast
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class ForecastMode(Enum):
-    """The forecast mode of a Weather entity."""
-
-    DAILY = 1
-    HOURLY = 2
-
-
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -140,6 +142,9 @@ async def async_setup_entry(
 class DwdWeather(SingleCoordinatorWeatherEntity[DwdDataUpdateCoordinator]):
     """Implementation of a DWD weather condition."""
 
+    # The age changes with every failed retry, which is not worth recording.
+    _unrecorded_attributes = frozenset({ATTR_STALE_AGE})
+
     def __init__(
         self,
         hass: HomeAssistant,
@@ -183,10 +188,39 @@ class DwdWeather(SingleCoordinatorWeatherEntity[DwdDataUpdateCoordinator]):
 
         self._attr_attribution = ATTRIBUTION
 
+        self._forecast_snapshot: DwdForecastSnapshot | None = None
+        self._sun_cache: DwdSunCache = async_get_sun_cache(hass)
+
+    async def async_added_to_hass(self) -> None:
+        """When entity is added to hass."""
+        await super().async_added_to_hass()
+        # The values of the current hour and the first hourly forecast change when the hour
+        # rolls over, even if there's no new data, which may take up to an hour.
+        self.async_on_remove(
+            async_track_utc_time_change(
+                self.hass, self._async_handle_hour_change, minute=0, second=0
+            )
+        )
+
+    async def _async_handle_hour_change(self, _now: datetime) -> None:
+        self.async_write_ha_state()
+        await self.async_update_listeners(("daily", "hourly"))
+
     @property
     def available(self) -> bool:
         """Return True if entity is available."""
-        return self.coordinator.last_update_success
+        # With fast start, there may be no data at all until the first refresh is done.
+        return (
+            self.coordinator.last_update_success and self.coordinator.data is not None
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the age of the data in seconds, while it can't be refreshed."""
+        stale_age = self.coordinator.stale_age
+        if stale_age is None:
+            return None
+        return {ATTR_STALE_AGE: round(stale_age)}
 
     @property
     def condition(self) -> str | None:
@@ -195,29 +229,27 @@ class DwdWeather(SingleCoordinatorWeatherEntity[DwdDataUpdateCoordinator]):
             CONF_CURRENT_WEATHER_MEASUREMENT,
             CONF_CURRENT_WEATHER_HYBRID,
         ):
-            str_value = self.coordinator.data[DWD_MEASUREMENT].get(
-                DWD_MEASUREMENT_PRESENT_WEATHER, None
-            )
+            str_value = self._get_measurement(DWD_MEASUREMENT_PRESENT_WEATHER)
             if str_value is None or str_value == "---":
                 if self._conf_current_weather == CONF_CURRENT_WEATHER_MEASUREMENT:
                     return None
                 else:
-                    forecast = self._get_forecast(ForecastMode.HOURLY, 1)
-                    if forecast is None or len(forecast) < 1:
+                    forecast = self._get_current_forecast()
+                    if forecast is None:
                         return None
                     else:
-                        return forecast[0].get(ATTR_FORECAST_CONDITION)
+                        return forecast.get(ATTR_FORECAST_CONDITION)
             else:
                 condition = CONDITIONS_MAP.get(int(str_value), "")
-                if condition == ATTR_CONDITION_SUNNY and not sun.is_up(self._hass):
+                if condition == ATTR_CONDITION_SUNNY and not self._sun_cache.is_up():
                     condition = ATTR_CONDITION_CLEAR_NIGHT
                 return condition
         elif self._conf_current_weather == CONF_CURRENT_WEATHER_FORECAST:
-            forecast = self._get_forecast(ForecastMode.HOURLY, 1)
-            if forecast is None or len(forecast) < 1:
+            forecast = self._get_current_forecast()
+            if forecast is None:
                 return None
             else:
-                return forecast[0].get(ATTR_FORECAST_CONDITION)
+                return forecast.get(ATTR_FORECAST_CONDITION)
         else:
             return None
 
@@ -280,6 +312,16 @@ class DwdWeather(SingleCoordinatorWeatherEntity[DwdDataUpdateCoordinator]):
             DWD_MEASUREMENT_MEANWIND_DIRECTION, ATTR_FORECAST_WIND_BEARING
         )
 
+    def _get_measurement(self, dwd_measurement: str) -> str | None:
+        # The measurement may be missing, if it couldn't be fetched yet, while the forecast
+        # could be fetched.
+        if self.coordinator.data is None:
+            return None
+        measurement = self.coordinator.data[DWD_MEASUREMENT]
+        if measurement is None:
+            return None
+        return measurement.get(dwd_measurement, None)
+
     def _get_float_measurement_with_fallback(
         self, dwd_measurement: str, attr_forecast: str
     ) -> float | None:
@@ -287,26 +329,24 @@ class DwdWeather(SingleCoordinatorWeatherEntity[DwdDataUpdateCoordinator]):
             CONF_CURRENT_WEATHER_MEASUREMENT,
             CONF_CURRENT_WEATHER_HYBRID,
         ):
-            str_value = self.coordinator.data[DWD_MEASUREMENT].get(
-                dwd_measurement, None
-            )
+            str_value = self._get_measurement(dwd_measurement)
             if str_value is None or str_value == "---":
                 if self._conf_current_weather == CONF_CURRENT_WEATHER_MEASUREMENT:
                     return None
                 else:
-                    forecast = self._get_forecast(ForecastMode.HOURLY, 1)
-                    if forecast is None or len(forecast) < 1:
+                    forecast = self._get_current_forecast()
+                    if forecast is None:
                         return None
                     else:
-                        return forecast[0].get(attr_forecast)
+                        return forecast.get(attr_forecast)
             else:
                 return DwdWeather._str_to_float(str_value)
         elif self._conf_current_weather == CONF_CURRENT_WEATHER_FORECAST:
-            forecast = self._get_forecast(ForecastMode.HOURLY, 1)
-            if forecast is None or len(forecast) < 1:
+            forecast = self._get_current_forecast()
+            if forecast is None:
                 return None
             else:
-                return forecast[0].get(attr_forecast)
+                return forecast.get(attr_forecast)
         else:
             return None
 
@@ -317,9 +357,7 @@ class DwdWeather(SingleCoordinatorWeatherEntity[DwdDataUpdateCoordinator]):
             CONF_CURRENT_WEATHER_MEASUREMENT,
             CONF_CURRENT_WEATHER_HYBRID,
         ):
-            str_value = self.coordinator.data[DWD_MEASUREMENT].get(
-                dwd_measurement, None
-            )
+            str_value = self._get_measurement(dwd_measurement)
             if str_value is None or str_value == "---":
                 return None
             else:
@@ -334,7 +372,10 @@ class DwdWeather(SingleCoordinatorWeatherEntity[DwdDataUpdateCoordinator]):
         if not self._config.options.get(CONF_FORECAST, CONF_FORECAST_DEFAULT):
             return None
 
-        return self._get_forecast(ForecastMode.DAILY)
+        snapshot = self._get_forecast_snapshot()
+        if snapshot is None:
+            return None
+        return snapshot.daily
 
     @callback
     def _async_forecast_hourly(self):
@@ -343,457 +384,380 @@ class DwdWeather(SingleCoordinatorWeatherEntity[DwdDataUpdateCoordinator]):
         if not self._config.options.get(CONF_FORECAST, CONF_FORECAST_DEFAULT):
             return None
 
-        return self._get_forecast(ForecastMode.HOURLY)
+        snapshot = self._get_forecast_snapshot()
+        if snapshot is None:
+            return None
+        return snapshot.hourly
+
+    def _get_forecast_snapshot(self) -> DwdForecastSnapshot | None:
+        if self.coordinator.data is None:
+            return None
+        dwd_forecast = self.coordinator.data[DWD_FORECAST]
+
+        if dwd_forecast is None:
+            return None
+
+        # The snapshot is only rebuilt when the coordinator delivers new data, all properties
+        # and forecast requests in between share it.
+        if (
+            self._forecast_snapshot is None
+            or self._forecast_snapshot.dwd_forecast is not dwd_forecast
+        ):
+            self._forecast_snapshot = DwdForecastSnapshot(self._sun_cache, dwd_forecast)
+
+        return self._forecast_snapshot
+
+    def _get_current_forecast(self) -> dict[str, Any] | None:
+        snapshot = self._get_forecast_snapshot()
+        if snapshot is None:
+            return None
+        return snapshot.current
+
+    @staticmethod
+    def _str_to_float(value: str) -> float | None:
+        if value == "---":
+            return None
+        else:
+            return float(value.replace(",", "."))
+
+
+class DwdForecastSnapshot:
+    """Hourly and daily forecast computed once from the data of a single coordinator update."""
+
+    def __init__(self, sun_cache: DwdSunCache, dwd_forecast: MosmixForecast) -> None:
+        """Initialize."""
+        self._sun_cache: DwdSunCache = sun_cache
+        self.dwd_forecast: MosmixForecast = dwd_forecast
+
+        # The hourly items do not depend on the current time, so they are only calculated once
+        # for all timestamps, including their ISO time strings and local days. Only the selection
+        # of the items that are returned depends on the current hour, see _update_current_hour.
+        self._days: list[date] = []
+        self._items: list[dict[str, Any]] = []
+
+        # Indices of the first item of each day. All days but the current one don't change when
+        # the current hour changes, so they are only aggregated once.
+        self._day_starts: list[int] = []
+        self._complete_days: dict[int, DwdWeatherDay] = {}
+
+        self._hour: datetime | None = None
+        self._hourly: list[dict[str, Any]] = []
+        self._daily: list[dict[str, Any]] = []
+
+        self._create_items()
+
+    @property
+    def hourly(self) -> list[dict[str, Any]]:
+        """Return the hourly forecast starting with the current hour."""
+        self._update_current_hour()
+        return self._hourly
+
+    @property
+    def daily(self) -> list[dict[str, Any]]:
+        """Return the daily forecast starting with the current day."""
+        self._update_current_hour()
+        return self._daily
 
-    def _get_forecast(self, forecast_mode: ForecastMode, max_hours: int = 0):
-        # We build both lists in parallel and just return the needed one. Although it's a small
-        # overhead, it still makes thinks easier, because there is still much in common, because to
-        # calculate the days most of the hourly stuff has to be done again.
-        hourly_list = []
-        daily_list = []
+    @property
+    def current(self) -> dict[str, Any] | None:
+        """Return the forecast of the current hour."""
+        # This doesn't need the whole hourly and daily forecast, so it's looked up directly.
+        for i in self.dwd_forecast.window(_get_earliest(datetime.now(UTC))):
+            if i >= len(self._items):
+                break
+            if ATTR_FORECAST_NATIVE_TEMP in self._items[i]:
+                return self._items[i]
+        return None
 
+    def _create_items(self) -> None:
         # For a description of all values see https://opendata.dwd.de/weather/lib/MetElementDefinition.xml
         # Unfortunately, "ww" is not documented there, but the assumption is that it's the same as for
         # "ww3", but hourly. However, "ww" is at least mentioned at
         # https://www.dwd.de/DE/leistungen/opendata/help/schluessel_datenformate/kml/mosmix_element_weather_xls.xlsx
 
-        dwd_forecast = self.coordinator.data[DWD_FORECAST]
-
-        if dwd_forecast is None:
-            return None
+        dwd_forecast = self.dwd_forecast
 
-        dwd_forecast_timestamp = dwd_forecast.get(DWD_FORECAST_TIMESTAMP, [])
-        dwd_forecast_TTT = dwd_forecast.get("TTT", [])
-        dwd_forecast_ww = dwd_forecast.get("ww", [])
-        dwd_forecast_Td = dwd_forecast.get("Td", [])
-        dwd_forecast_Neff = dwd_forecast.get("Neff", [])
-        dwd_forecast_RR1c = dwd_forecast.get("RR1c", [])
-        dwd_forecast_wwP = dwd_forecast.get("wwP", [])
-        dwd_forecast_PPPP = dwd_forecast.get("PPPP", [])
-        dwd_forecast_DD = dwd_forecast.get("DD", [])
-        dwd_forecast_FF = dwd_forecast.get("FF", [])
-        dwd_forecast_FX1 = dwd_forecast.get("FX1", [])
+        dwd_forecast_timestamp = dwd_forecast.timestamps
+        dwd_forecast_TTT = dwd_forecast.get("TTT")
+        dwd_forecast_ww = dwd_forecast.get("ww")
+        dwd_forecast_Td = dwd_forecast.get("Td")
+        dwd_forecast_Neff = dwd_forecast.get("Neff")
+        dwd_forecast_RR1c = dwd_forecast.get("RR1c")
+        dwd_forecast_wwP = dwd_forecast.get("wwP")
+        dwd_forecast_PPPP = dwd_forecast.get("PPPP")
+        dwd_forecast_DD = dwd_forecast.get("DD")
+        dwd_forecast_FF = dwd_forecast.get("FF")
+        dwd_forecast_FX1 = dwd_forecast.get("FX1")
 
-        current_day: DwdWeatherDay = None
+        conditions = ww_to_conditions(dwd_forecast_ww)
 
         # Timestamp and temperature are mandatory attributes of the forcast entity,
         # see https://developers.home-assistant.io/docs/core/entity/weather/
         for i in range(min(len(dwd_forecast_timestamp), len(dwd_forecast_TTT))):
-            timestamp = dwd_forecast_timestamp[i]
-
-            # The forcast contains data from a few hour back. However, the earlist we want to return
-            # is from the current hour (i.e. at most one hour back), because that's what other
-            # Home Assistant components like UI elements expect. They use just everything we give them.
-            if timestamp > datetime.now(UTC) - timedelta(hours=1):
-                hourly_item = {}
-
-                hourly_item[ATTR_FORECAST_TIME] = timestamp.isoformat()
-
-                timestamp_local = dt_util.as_local(timestamp)
-                day = timestamp_local.date()
-                if current_day is None or current_day.day != day:
-                    current_day = DwdWeatherDay(day, dwd_forecast)
-                    daily_list.append(current_day)
-                current_day.add_hour(hourly_item, i)
-
-                # TTT is in K
-                raw_temperature_value = dwd_forecast_TTT[i]
-                if raw_temperature_value != "-":
-                    temperature_celcius = float(raw_temperature_value) - 273.15
-                    hourly_item[ATTR_FORECAST_NATIVE_TEMP] = temperature_celcius
-
-                    # If there is no temperature, we skip this entry, because it's a mandatory attribute!
-
-                    # There are actually two sources for the mapping of the "ww" field. The primary description seems to be
-                    # https://www.dwd.de/DE/leistungen/opendata/help/schluessel_datenformate/kml/mosmix_element_weather_xls.xlsx
-                    # However, at first I found
-                    # https://www.dwd.de/DE/leistungen/pbfb_verlag_vub/pdf_einzelbaende/vub_2_binaer_barrierefrei.pdf
-                    # ("Aktuelles Wetter" on page 229) and started the implementation based on that. The first link basically
-                    # seems to be a subset of the second link. I still have some doubts regarding the values 0-3. There seems
-                    # to be a slight difference between the two documentations, and the value does no behave exactly as descibed.
-                    # For exmaple, the documentation says that 3 is for effective cloud coverage of at least 7/8 and 2 for
-                    # effective cloud coverage 4.6/8 to 6/8, but I could observe 3 even for 78% which is much below 6/8.
-                    # Still using it for now, the behavior at least seems to be the same as in the WarnWetter app so far.
-                    if i < len(dwd_forecast_ww):
-                        raw_weather_value = dwd_forecast_ww[i]
-                        if raw_weather_value != "-":
-                            weather_value = int(round(float(raw_weather_value), 0))
-                            if weather_value == 0:
-                                if sun.is_up(self._hass, timestamp):
-                                    hourly_item[ATTR_FORECAST_CONDITION] = (
-                                        ATTR_CONDITION_SUNNY
-                                    )
-                                else:
-                                    hourly_item[ATTR_FORECAST_CONDITION] = (
-                                        ATTR_CONDITION_CLEAR_NIGHT
-                                    )
-                            elif 1 <= weather_value <= 2:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_PARTLYCLOUDY
-                                )
-                            elif weather_value == 3:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_CLOUDY
-                                )
-                            elif 4 <= weather_value <= 12:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_FOG
-                                )
-                            elif weather_value == 13:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_LIGHTNING
-                                )
-                            elif 14 <= weather_value <= 16:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif weather_value == 17:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_LIGHTNING
-                                )
-                            elif weather_value == 18:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_WINDY
-                                )
-                            elif weather_value == 19:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_WINDY_VARIANT
-                                )
-                            elif 20 <= weather_value <= 21:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif weather_value == 22:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_SNOWY
-                                )
-                            elif weather_value == 23:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_SNOWY_RAINY
-                                )
-                            elif 24 <= weather_value <= 25:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif weather_value == 26:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_SNOWY
-                                )
-                            elif weather_value == 27:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_HAIL
-                                )
-                            elif weather_value == 28:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_FOG
-                                )
-                            elif weather_value == 29:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_LIGHTNING_RAINY
-                                )
-                            elif 30 <= weather_value <= 39:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_WINDY
-                                )
-                            elif 40 <= weather_value <= 49:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_FOG
-                                )
-                            elif 50 <= weather_value <= 63:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif 64 <= weather_value <= 65:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_POURING
-                                )
-                            elif 66 <= weather_value <= 67:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif 68 <= weather_value <= 69:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_SNOWY_RAINY
-                                )
-                            elif 70 <= weather_value <= 79:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_SNOWY
-                                )
-                            elif 80 <= weather_value <= 81:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif weather_value == 82:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_POURING
-                                )
-                            elif 83 <= weather_value <= 84:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_SNOWY_RAINY
-                                )
-                            elif 85 <= weather_value <= 88:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_SNOWY
-                                )
-                            elif 89 <= weather_value <= 90:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_HAIL
-                                )
-                            elif 91 <= weather_value <= 99:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_LIGHTNING_RAINY
-                                )
-                            elif weather_value == 100:
-                                if sun.is_up(self._hass, timestamp):
-                                    hourly_item[ATTR_FORECAST_CONDITION] = (
-                                        ATTR_CONDITION_SUNNY
-                                    )
-                                else:
-                                    hourly_item[ATTR_FORECAST_CONDITION] = (
-                                        ATTR_CONDITION_CLEAR_NIGHT
-                                    )
-                            elif 101 <= weather_value <= 102:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_PARTLYCLOUDY
-                                )
-                            elif weather_value == 103:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_CLOUDY
-                                )
-                            elif 104 <= weather_value <= 105:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_FOG
-                                )
-                            elif weather_value == 110:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_FOG
-                                )
-                            elif weather_value == 111:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_SNOWY
-                                )
-                            elif weather_value == 112:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_LIGHTNING
-                                )
-                            elif weather_value == 118:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_WINDY
-                                )
-                            elif weather_value == 120:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_FOG
-                                )
-                            elif 121 <= weather_value <= 123:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif weather_value == 124:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_SNOWY
-                                )
-                            elif weather_value == 125:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif weather_value == 126:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_LIGHTNING_RAINY
-                                )
-                            elif 127 <= weather_value <= 129:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_WINDY
-                                )
-                            elif 130 <= weather_value <= 135:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_FOG
-                                )
-                            elif 140 <= weather_value <= 141:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif weather_value == 142:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_POURING
-                                )
-                            elif weather_value == 143:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif weather_value == 144:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_POURING
-                                )
-                            elif 145 <= weather_value <= 146:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_HAIL
-                                )
-                            elif 147 <= weather_value <= 148:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif 150 <= weather_value <= 158:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif 160 <= weather_value <= 162:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif weather_value == 163:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_POURING
-                                )
-                            elif 164 <= weather_value <= 165:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif weather_value == 166:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_POURING
-                                )
-                            elif 167 <= weather_value <= 168:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_SNOWY_RAINY
-                                )
-                            elif 170 <= weather_value <= 178:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_SNOWY
-                                )
-                            elif 180 <= weather_value <= 182:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_RAINY
-                                )
-                            elif 183 <= weather_value <= 184:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_POURING
-                                )
-                            elif 185 <= weather_value <= 187:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_SNOWY
-                                )
-                            elif weather_value == 189:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_HAIL
-                                )
-                            elif 190 <= weather_value <= 191:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_LIGHTNING
-                                )
-                            elif 192 <= weather_value <= 193:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_LIGHTNING_RAINY
-                                )
-                            elif weather_value == 194:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_LIGHTNING
-                                )
-                            elif 195 <= weather_value <= 196:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_LIGHTNING_RAINY
-                                )
-                            elif weather_value == 199:
-                                hourly_item[ATTR_FORECAST_CONDITION] = (
-                                    ATTR_CONDITION_WINDY_VARIANT
-                                )
-
-                    # Td is in K
-                    if i < len(dwd_forecast_Td):
-                        raw_dew_point_value = dwd_forecast_Td[i]
-                        if raw_dew_point_value != "-":
-                            dew_point_celcius = float(raw_dew_point_value) - 273.15
-                            hourly_item[ATTR_FORECAST_DEW_POINT] = round(
-                                dew_point_celcius, 1
-                            )
-
-                    # Neff is in %
-                    if i < len(dwd_forecast_Neff):
-                        raw_cloud_coverage_value = dwd_forecast_Neff[i]
-                        if raw_cloud_coverage_value != "-":
-                            cloud_coverage_value = float(raw_cloud_coverage_value)
-                            hourly_item[ATTR_FORECAST_CLOUD_COVERAGE] = (
-                                cloud_coverage_value
-                            )
-
-                    # RR1c is in kg/m2 which is equal to mm
-                    if i < len(dwd_forecast_RR1c):
-                        raw_value = dwd_forecast_RR1c[i]
-                        if raw_value != "-":
-                            precipitation_mm = float(raw_value)
-                            hourly_item[ATTR_FORECAST_NATIVE_PRECIPITATION] = (
-                                precipitation_mm
-                            )
-
-                    # wwP is in %
-                    if i < len(dwd_forecast_wwP):
-                        raw_value = dwd_forecast_wwP[i]
-                        if raw_value != "-":
-                            hourly_item[ATTR_FORECAST_PRECIPITATION_PROBABILITY] = int(
-                                round(float(raw_value), 0)
-                            )
-
-                    # PPPP is in Pa
-                    if i < len(dwd_forecast_PPPP):
-                        raw_value = dwd_forecast_PPPP[i]
-                        if raw_value != "-":
-                            hourly_item[ATTR_FORECAST_NATIVE_PRESSURE] = (
-                                float(raw_value) * 0.01
-                            )
-
-                    # DD is in °
-                    if i < len(dwd_forecast_DD):
-                        raw_value = dwd_forecast_DD[i]
-                        if raw_value != "-":
-                            hourly_item[ATTR_FORECAST_WIND_BEARING] = float(raw_value)
-
-                    # FF is in m/s
-                    if i < len(dwd_forecast_FF):
-                        raw_value = dwd_forecast_FF[i]
-                        if raw_value != "-":
-                            wind_speed_kmh = float(raw_value) * 3.6
-                            hourly_item[ATTR_FORECAST_NATIVE_WIND_SPEED] = int(
-                                round(wind_speed_kmh, 0)
-                            )
-
-                    # FX1 is in m/s
-                    if i < len(dwd_forecast_FX1):
-                        raw_value = dwd_forecast_FX1[i]
-                        if raw_value != "-":
-                            wind_gust_speed_kmh = float(raw_value) * 3.6
-                            hourly_item[ATTR_FORECAST_NATIVE_WIND_GUST_SPEED] = int(
-                                round(wind_gust_speed_kmh, 0)
-                            )
-
-                    hourly_list.append(hourly_item)
-
-                    if max_hours > 0 and len(hourly_list) >= max_hours:
-                        break
-
-        if forecast_mode == ForecastMode.DAILY:
-            result = []
-            if len(daily_list) > 0:
-                # Always add current day:
-                result.append(daily_list[0].values)
-                # Only add other days of they are complete
-                for i in range(1, len(daily_list)):
-                    if daily_list[i].has_enough_hours:
-                        result.append(daily_list[i].values)
-            return result
-        if forecast_mode == ForecastMode.HOURLY:
-            return hourly_list
+            timestamp = datetime.fromtimestamp(dwd_forecast_timestamp[i], UTC)
+
+            hourly_item = {}
+
+            hourly_item[ATTR_FORECAST_TIME] = timestamp.isoformat()
+
+            day = dt_util.as_local(timestamp).date()
+            if not self._days or self._days[-1] != day:
+                self._day_starts.append(i)
+            self._days.append(day)
+            self._items.append(hourly_item)
+
+            # TTT is in K
+            temperature_value = dwd_forecast_TTT[i]
+            if not isnan(temperature_value):
+                temperature_celcius = temperature_value - 273.15
+                hourly_item[ATTR_FORECAST_NATIVE_TEMP] = temperature_celcius
+
+                # If there is no temperature, we skip this entry, because it's a mandatory attribute!
+
+                if i < len(conditions):
+                    condition = conditions[i]
+                    if condition == CONDITION_SUNNY_OR_CLEAR_NIGHT:
+                        if self._sun_cache.is_up(timestamp):
+                            condition = ATTR_CONDITION_SUNNY
+                        else:
+                            condition = ATTR_CONDITION_CLEAR_NIGHT
+                    if condition is not None:
+                        hourly_item[ATTR_FORECAST_CONDITION] = condition
+
+                # Td is in K
+                if i < len(dwd_forecast_Td):
+                    dew_point_value = dwd_forecast_Td[i]
+                    if not isnan(dew_point_value):
+                        dew_point_celcius = dew_point_value - 273.15
+                        hourly_item[ATTR_FORECAST_DEW_POINT] = round(
+                            dew_point_celcius, 1
+                        )
+
+                # Neff is in %
+                if i < len(dwd_forecast_Neff):
+                    cloud_coverage_value = dwd_forecast_Neff[i]
+                    if not isnan(cloud_coverage_value):
+                        hourly_item[ATTR_FORECAST_CLOUD_COVERAGE] = cloud_coverage_value
+
+                # RR1c is in kg/m2 which is equal to mm
+                if i < len(dwd_forecast_RR1c):
+                    value = dwd_forecast_RR1c[i]
+                    if not isnan(value):
+                        precipitation_mm = value
+                        hourly_item[ATTR_FORECAST_NATIVE_PRECIPITATION] = (
+                            precipitation_mm
+                        )
+
+                # wwP is in %
+                if i < len(dwd_forecast_wwP):
+                    value = dwd_forecast_wwP[i]
+                    if not isnan(value):
+                        hourly_item[ATTR_FORECAST_PRECIPITATION_PROBABILITY] = int(
+                            round(value, 0)
+                        )
+
+                # PPPP is in Pa
+                if i < len(dwd_forecast_PPPP):
+                    value = dwd_forecast_PPPP[i]
+                    if not isnan(value):
+                        hourly_item[ATTR_FORECAST_NATIVE_PRESSURE] = value * 0.01
+
+                # DD is in °
+                if i < len(dwd_forecast_DD):
+                    value = dwd_forecast_DD[i]
+                    if not isnan(value):
+                        hourly_item[ATTR_FORECAST_WIND_BEARING] = value
+
+                # FF is in m/s
+                if i < len(dwd_forecast_FF):
+                    value = dwd_forecast_FF[i]
+                    if not isnan(value):
+                        wind_speed_kmh = value * 3.6
+                        hourly_item[ATTR_FORECAST_NATIVE_WIND_SPEED] = int(
+                            round(wind_speed_kmh, 0)
+                        )
+
+                # FX1 is in m/s
+                if i < len(dwd_forecast_FX1):
+                    value = dwd_forecast_FX1[i]
+                    if not isnan(value):
+                        wind_gust_speed_kmh = value * 3.6
+                        hourly_item[ATTR_FORECAST_NATIVE_WIND_GUST_SPEED] = int(
+                            round(wind_gust_speed_kmh, 0)
+                        )
+
+    def _update_current_hour(self) -> None:
+        now = datetime.now(UTC)
+        hour = now.replace(minute=0, second=0, microsecond=0)
+
+        if hour == self._hour:
+            return
+
+        self._hour = hour
+
+        start = min(self.dwd_forecast.index_after(_get_earliest(now)), len(self._items))
+
+        self._hourly = [
+            x for x in self._items[start:] if ATTR_FORECAST_NATIVE_TEMP in x
+        ]
+
+        self._daily = []
+        if start < len(self._items):
+            # Always add current day, which starts with the current hour:
+            next_day = bisect_right(self._day_starts, start)
+            self._daily.append(
+                self._create_day(start, self._get_day_end(next_day)).values
+            )
+            # Only add other days of they are complete
+            for i in range(next_day, len(self._day_starts)):
+                day = self._complete_days.get(i)
+                if day is None:
+                    day = self._create_day(
+                        self._day_starts[i], self._get_day_end(i + 1)
+                    )
+                    self._complete_days[i] = day
+                if day.has_enough_hours:
+                    self._daily.append(day.values)
+
+    def _get_day_end(self, next_day: int) -> int:
+        if next_day < len(self._day_starts):
+            return self._day_starts[next_day]
+        return len(self._items)
+
+    def _create_day(self, start: int, end: int) -> DwdWeatherDay:
+        day = DwdWeatherDay(self._days[start])
+        for i in range(start, end):
+            day.add_hour(self._items[i])
+        return day
+
+
+def _get_earliest(now: datetime) -> float:
+    """Return the timestamp after which forecast items are returned."""
+    # The forcast contains data from a few hour back. However, the earlist we want to return
+    # is from the current hour (i.e. at most one hour back), because that's what other
+    # Home Assistant components like UI elements expect. They use just everything we give them.
+    return (now - timedelta(hours=1)).timestamp()
+
+
+@callback
+def async_get_sun_cache(hass: HomeAssistant) -> DwdSunCache:
+    """Return the sun cache that is shared by all DWD weather entities."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_SUN_CACHE not in domain_data:
+        domain_data[DATA_SUN_CACHE] = DwdSunCache(hass)
+    return domain_data[DATA_SUN_CACHE]
+
+
+class DwdSunCache:
+    """Caches sunrise and sunset per date for the location of Home Assistant.
+
+    The result of is_up is the same as of homeassistant.helpers.sun.is_up, but without
+    calculating the sun events again for every call.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self._hass: HomeAssistant = hass
+        self._location: tuple | None = None
+        self._events: dict[date, tuple[datetime | None, datetime | None]] = {}
+
+    def is_up(self, utc_point_in_time: datetime | None = None) -> bool:
+        """Return True, if the sun is up at the given point in time, or now if None."""
+
+        if utc_point_in_time is None:
+            utc_point_in_time = dt_util.utcnow()
+
+        next_sunrise = None
+        next_sunset = None
+
+        # Same search as in homeassistant.helpers.sun.get_astral_event_next, starting at the day
+        # before, because e.g. the sunset of the previous day may still be ahead in UTC.
+        day = dt_util.as_local(utc_point_in_time).date()
+        for offset in range(-1, 3):
+            sunrise, sunset = self._get_events(day + timedelta(days=offset))
+            if sunrise is None or sunset is None:
+                # Polar day or night, so the next events might be far away. That's the rare
+                # case, let Home Assistant do the search.
+                break
+            if next_sunrise is None and sunrise > utc_point_in_time:
+                next_sunrise = sunrise
+            if next_sunset is None and sunset > utc_point_in_time:
+                next_sunset = sunset
+            if next_sunrise is not None and next_sunset is not None:
+                return next_sunrise > next_sunset
+
+        return sun.is_up(self._hass, utc_point_in_time)
+
+    def _get_events(self, day: date) -> tuple[datetime | None, datetime | None]:
+        location = (
+            self._hass.config.latitude,
+            self._hass.config.longitude,
+            self._hass.config.elevation,
+            self._hass.config.time_zone,
+        )
+        if location != self._location:
+            self._location = location
+            self._events.clear()
+
+        events = self._events.get(day)
+        if events is None:
+            # Dates far from the queried one are not needed anymore, e.g. those of the past days.
+            # Only checked when a date is added, so the cache stays bounded without any cost for hits.
+            for x in [x for x in self._events if abs((x - day).days) > SUN_CACHE_DAYS]:
+                del self._events[x]
+            events = (
+                sun.get_astral_event_date(self._hass, SUN_EVENT_SUNRISE, day),
+                sun.get_astral_event_date(self._hass, SUN_EVENT_SUNSET, day),
+            )
+            self._events[day] = events
+        return events
+
+
+# MOSMIX provides the "ww" values as floats, but always with integral values. Looking them up
+# directly by the float value saves the rounding for almost all values.
+_WW_CONDITIONS_BY_VALUE = {float(value): x for value, x in enumerate(WW_CONDITIONS)}
 
+
+def ww_to_conditions(ww_values: Iterable[float]) -> list[str | None]:
+    """Map MOSMIX "ww" values to conditions in one pass, see WW_CONDITIONS."""
+    return [
+        _WW_CONDITIONS_BY_VALUE[raw_value]
+        if raw_value in _WW_CONDITIONS_BY_VALUE
+        else _ww_to_condition(raw_value)
+        for raw_value in ww_values
+    ]
+
+
+def _ww_to_condition(raw_value: float) -> str | None:
+    if isnan(raw_value):
         return None
+    value = int(round(raw_value, 0))
+    if 0 <= value < len(WW_CONDITIONS):
+        return WW_CONDITIONS[value]
+    return None
 
-    @staticmethod
-    def _str_to_float(value: str) -> float | None:
-        if value == "---":
-            return None
-        else:
-            return float(value.replace(",", "."))
+
+# The hourly values that are aggregated per day, and the indices of their statistics.
+_DAILY_KEYS = (
+    ATTR_FORECAST_NATIVE_TEMP,
+    ATTR_FORECAST_NATIVE_PRECIPITATION,
+    ATTR_FORECAST_NATIVE_PRESSURE,
+    ATTR_FORECAST_NATIVE_WIND_GUST_SPEED,
+    ATTR_FORECAST_NATIVE_WIND_SPEED,
+    ATTR_FORECAST_CLOUD_COVERAGE,
+)
+_MIN = 0
+_MAX = 1
+_SUM = 2
+_COUNT = 3
 
 
 class DwdWeatherDay:
-    """Manages the weather data of a single day."""
+    """Manages the weather data of a single day.
+
+    The hourly values are aggregated as the hours are added, so all values of the day are
+    calculated in a single pass over the hours.
+    """
 
     @property
     def day(self) -> date:
@@ -806,22 +770,26 @@ class DwdWeatherDay:
         # We do not insist on 24 hours,
         # 1. because the day might have 23 or 25 hours on DST changes.
         # 2. to be a bit robust in case data is missing for very few hours (although we didn't observe this yet).
-        return len(self._hours) > 20
+        return self._hours > 20
 
     @property
     def values(self) -> dict[str, Any]:
         """Returns the value of the day as a dict."""
+        if self._values is None:
+            self._values = self._get_values()
+        return self._values
 
+    def _get_values(self) -> dict[str, Any]:
         result = {}
 
         result[ATTR_FORECAST_TIME] = datetime.combine(
             self._day, time(0, 0, 0)
         ).isoformat()
 
-        temperature_values = self._get_hourly_values(ATTR_FORECAST_NATIVE_TEMP)
-        if len(temperature_values) > 0:
-            result[ATTR_FORECAST_NATIVE_TEMP] = max(temperature_values)
-            result[ATTR_FORECAST_NATIVE_TEMP_LOW] = min(temperature_values)
+        temperature = self._stats.get(ATTR_FORECAST_NATIVE_TEMP)
+        if temperature is not None:
+            result[ATTR_FORECAST_NATIVE_TEMP] = temperature[_MAX]
+            result[ATTR_FORECAST_NATIVE_TEMP_LOW] = temperature[_MIN]
 
         # Danger: The following has a slight ruonding error. You can easily see that because if you
         # sum up RR1c ("Total precipitation during the last hour consistent with significant weather"),
@@ -829,48 +797,34 @@ class DwdWeatherDay:
         # consistent with significant weather"). Usually this seems not to be too big, e.g. a sum of
         # 1.7 mm instead of 1.6 mm. Unfortunately, we can't use RRdc either, because it's not aligned
         # to days.
-        precipitation_values = self._get_hourly_values(
-            ATTR_FORECAST_NATIVE_PRECIPITATION
-        )
-        if len(precipitation_values) > 0:
-            precipitation = sum(precipitation_values)
-            result[ATTR_FORECAST_NATIVE_PRECIPITATION] = round(precipitation, 2)
+        precipitation = self._stats.get(ATTR_FORECAST_NATIVE_PRECIPITATION)
+        if precipitation is not None:
+            result[ATTR_FORECAST_NATIVE_PRECIPITATION] = round(precipitation[_SUM], 2)
+
+        pressure = self._stats.get(ATTR_FORECAST_NATIVE_PRESSURE)
+        if pressure is not None:
+            result[ATTR_FORECAST_NATIVE_PRESSURE] = round(
+                pressure[_SUM] / pressure[_COUNT], 1
+            )
+
+        wind_gust_speed = self._stats.get(ATTR_FORECAST_NATIVE_WIND_GUST_SPEED)
+        if wind_gust_speed is not None:
+            result[ATTR_FORECAST_NATIVE_WIND_GUST_SPEED] = round(
+                wind_gust_speed[_MAX], 0
+            )
 
-        pressure_values = self._get_hourly_values(ATTR_FORECAST_NATIVE_PRESSURE)
-        if len(pressure_values) > 0:
-            pressure = sum(pressure_values) / len(pressure_values)
-            result[ATTR_FORECAST_NATIVE_PRESSURE] = round(pressure, 1)
+        wind_speed = self._stats.get(ATTR_FORECAST_NATIVE_WIND_SPEED)
+        if wind_speed is not None:
+            result[ATTR_FORECAST_NATIVE_WIND_SPEED] = round(
+                wind_speed[_SUM] / wind_speed[_COUNT], 0
+            )
 
-        wind_gust_speed_values = self._get_hourly_values(
-            ATTR_FORECAST_NATIVE_WIND_GUST_SPEED
-        )
-        if len(wind_gust_speed_values) > 0:
-            wind_gust_speed = max(wind_gust_speed_values)
-            result[ATTR_FORECAST_NATIVE_WIND_GUST_SPEED] = round(wind_gust_speed, 0)
-
-        wind_speed_values = self._get_hourly_values(ATTR_FORECAST_NATIVE_WIND_SPEED)
-        if len(wind_speed_values) > 0:
-            wind_speed = sum(wind_speed_values) / len(wind_speed_values)
-            result[ATTR_FORECAST_NATIVE_WIND_SPEED] = round(wind_speed, 0)
-
-        cloud_coverage_sum = 0
-        cloud_coverage_items = 0
-        cloud_coverage_avg = 0
-        for hour in self._hours:
-            cloud_coverage = hour.get(ATTR_FORECAST_CLOUD_COVERAGE, None)
-            if cloud_coverage is not None:
-                cloud_coverage_sum += cloud_coverage
-                cloud_coverage_items += 1
-
-        if cloud_coverage_items > 0:
-            cloud_coverage_avg = cloud_coverage_sum / cloud_coverage_items
+        cloud_coverage = self._stats.get(ATTR_FORECAST_CLOUD_COVERAGE)
+        if cloud_coverage is not None:
+            cloud_coverage_avg = cloud_coverage[_SUM] / cloud_coverage[_COUNT]
             result[ATTR_FORECAST_CLOUD_COVERAGE] = round(cloud_coverage_avg, 0)
 
-            condition_stats = {}
-            for hour in self._hours:
-                condition = hour.get(ATTR_FORECAST_CONDITION, None)
-                if condition is not None:
-                    condition_stats[condition] = condition_stats.get(condition, 0) + 1
+            condition_stats = self._condition_stats
             if len(condition_stats) == 1:
                 for condition in condition_stats:
                     result[ATTR_FORECAST_CONDITION] = condition
@@ -915,22 +869,37 @@ class DwdWeatherDay:
 
         return result
 
-    def _get_hourly_values(self, key: str) -> list:
-        return list(
-            filter(
-                lambda x: x is not None,
-                (x.get(key, None) for x in self._hours),
-            )
-        )
-
-    def __init__(self, day: date, dwd_forecast: dict[str, Any]) -> None:
+    def __init__(self, day: date) -> None:
         """Initialize."""
         self._day: date = day
-        self._dwd_forecast: dict[str, Any] = dwd_forecast
-        self._hours: list[dict[str, Any]] = []
-        self._hour_indices: list[int] = []
+        self._hours: int = 0
 
-    def add_hour(self, hour_item: dict[str, Any], index: int) -> None:
+        # Minimum, maximum, sum and count of the hourly values per key, and how often each
+        # condition occurs.
+        self._stats: dict[str, list[float]] = {}
+        self._condition_stats: dict[str, int] = {}
+        self._values: dict[str, Any] | None = None
+
+    def add_hour(self, hour_item: dict[str, Any]) -> None:
         """Add hour information to this day."""
-        self._hours.append(hour_item)
-        self._hour_indices.append(index)
+        self._hours += 1
+        self._values = None
+
+        for key in _DAILY_KEYS:
+            value = hour_item.get(key)
+            if value is None:
+                continue
+            stats = self._stats.get(key)
+            if stats is None:
+                self._stats[key] = [value, value, value, 1]
+                continue
+            stats[_MIN] = min(stats[_MIN], value)
+            stats[_MAX] = max(stats[_MAX], value)
+            stats[_SUM] += value
+            stats[_COUNT] += 1
+
+        condition = hour_item.get(ATTR_FORECAST_CONDITION)
+        if condition is not None:
+            self._condition_stats[condition] = (
+                self._condition_stats.get(condition, 0) + 1
+            )
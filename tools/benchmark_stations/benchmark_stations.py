@@ -0,0 +1,74 @@
+# Benchmarks for the station catalog used by the config flow of the dwd component.
+# Requires Home Assistant to be installed in the Python environment, as the component imports it.
+#
+# Usage: python benchmark_stations.py [latitude longitude]
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", ".."))
+
+from homeassistant.const import UnitOfLength
+from homeassistant.util import location
+from homeassistant.util.unit_conversion import DistanceConverter
+
+from custom_components.dwd.stations import STATIONS_BIN, STATIONS_JSON, DwdStationCatalog, DwdStationIndex
+
+ROUNDS = 20
+
+
+def benchmark(name: str, function, rounds: int = ROUNDS):
+    function()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = function()
+    duration = (time.perf_counter() - start) / rounds
+    print(f"{name.ljust(50)} {duration * 1000:8.2f} ms")
+    return result
+
+
+def memory(name: str, function) -> None:
+    tracemalloc.start()
+    result = function()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f"{name.ljust(50)} {retained / 1024:8.0f} KiB retained, {peak / 1024:.0f} KiB peak")
+
+
+if __name__ == "__main__":
+
+    latitude, longitude = (float(sys.argv[1]), float(sys.argv[2])) if len(sys.argv) == 3 else (50.11, 8.68)
+    length_unit = UnitOfLength.MILES
+
+    catalog = DwdStationCatalog.load()
+    print(f"{len(catalog)} stations, distances from {latitude}, {longitude} in {length_unit}")
+    print()
+
+    # Building the spatial index is the same for both formats and is therefore shown separately.
+    benchmark("Load stations.json (including index)", lambda: DwdStationCatalog.load_json(STATIONS_JSON), 5)
+    benchmark("Load stations.bin (including index)", lambda: DwdStationCatalog.load_binary(STATIONS_BIN), 5)
+    benchmark("Build spatial index only", lambda: DwdStationIndex(catalog.latitudes, catalog.longitudes), 5)
+    memory("Memory stations.json", lambda: DwdStationCatalog.load_json(STATIONS_JSON))
+    memory("Memory stations.bin", lambda: DwdStationCatalog.load_binary(STATIONS_BIN))
+    print()
+
+    def per_station():
+        # This is what the config flow did before, one call per station via hass.config.distance.
+        return [DistanceConverter.convert(location.distance(latitude, longitude, x.latitude, x.longitude), UnitOfLength.METERS, length_unit) for x in catalog]
+
+    scale = 1 / DistanceConverter.get_unit_ratio(UnitOfLength.KILOMETERS, length_unit)
+
+    def batched():
+        # Converted with a single factor, same as the config flow does.
+        return [x * scale for x in catalog.distances(latitude, longitude, range(len(catalog)))]
+
+    expected = benchmark("Per station (Vincenty, converted one by one)", per_station)
+    actual = benchmark("Batched (haversine over columns, one factor)", batched)
+    benchmark("Nearest 100 via spatial index", lambda: catalog.index.nearest(latitude, longitude, 100))
+
+    deviation = max(abs(x - y) / x for x, y in zip(expected, actual) if x > 0)
+    print()
+    print(f"Max. relative deviation haversine vs. Vincenty: {deviation * 100:.3f} %")
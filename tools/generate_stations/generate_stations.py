@@ -8,6 +8,9 @@
 import json
 import os
 import re
+import struct
+import sys
+from array import array
 import urllib.request
 import codecs
 import datetime
@@ -18,9 +21,50 @@ SOURCE_MOSMIX_STATIONSKATALOG = 1
 
 NAME_RE = re.compile("[A-ZÄÖÜ]{2,}")
 
+# Format of stations.bin, must match the reader in custom_components/dwd/stations.py.
+BINARY_MAGIC = b"DWDS"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sHII")
+FLAG_MEASUREMENT = 1
+FLAG_FORECAST = 2
+
 def beautify_name(name: str) -> str:
     return NAME_RE.sub(lambda x: x.group()[0] + x.group()[1:].lower(), name)
 
+def write_binary_catalog(filename: str, stations: list) -> None:
+    # Fixed-width little-endian columns with one value per station, followed by a table of all
+    # distinct strings, so that the integration can load it without parsing each station.
+    strings = []
+    string_indices = {}
+    def intern(value: str) -> int:
+        if "\0" in value:
+            raise ValueError(f"NUL character in {value!r}")
+        if value not in string_indices:
+            string_indices[value] = len(strings)
+            strings.append(value)
+        return string_indices[value]
+
+    columns = [
+        array("d", (x["latitude"] for x in stations)),
+        array("d", (x["longitude"] for x in stations)),
+        array("d", (x["altitude"] for x in stations)),
+        array("I", (intern(x["id"]) for x in stations)),
+        array("I", (intern(x["name"]) for x in stations)),
+        array("B", ((FLAG_MEASUREMENT if x["measurement"] else 0) | (FLAG_FORECAST if x["forecast"] else 0) for x in stations)),
+        array("B", (x["source"] for x in stations)),
+    ]
+    string_table = "\0".join(strings).encode("utf-8")
+
+    with open(filename, "wb") as file:
+        file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(stations), len(string_table)))
+        for column in columns:
+            if column.typecode == "I" and column.itemsize != 4:
+                raise RuntimeError("Unsupported size of unsigned int")
+            if sys.byteorder != "little":
+                column.byteswap()
+            column.tofile(file)
+        file.write(string_table)
+
 if __name__ == "__main__":
 
     measurement_href_pattern = re.compile(r"^(.*[^_])_*-BEOB\.csv$")
@@ -150,6 +194,11 @@ if __name__ == "__main__":
         json.dump(result, file, ensure_ascii=False)
     print(f"done.")
 
+    filename = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..", "custom_components", "dwd", "stations.bin")
+    print(f"Writing stations to {filename}...", end="", flush=True)
+    write_binary_catalog(filename, result)
+    print(f"done.")
+
     filename = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..", "stations.md")
     print(f"Writing stations to {filename}...", end="", flush=True)
     with open(filename, "wt", encoding="utf-8") as file: